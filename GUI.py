@@ -1,17 +1,35 @@
-from datetime import datetime
+import bisect
+import itertools
+import logging
+import threading
+import weakref
+from datetime import datetime, timedelta
 from PyQt5.QtWidgets import QPushButton,QVBoxLayout, QDialog, QLabel, \
-QLineEdit, QDateEdit, QTimeEdit, QComboBox, QMessageBox
-from PyQt5 import QtWidgets, QtCore
+QLineEdit, QDateEdit, QTimeEdit, QComboBox, QMessageBox, QSpinBox, QCheckBox
+from PyQt5 import QtWidgets, QtCore, sip
+import recurrence
 import task_config
-from management import TaskManager
+from worker import TaskWorker
+
+logger = logging.getLogger(__name__)
 
 
 class MainWindow(QtWidgets.QWidget):
-    def __init__(self, task_manager):
+    SEARCH_DELAY = 200  # 毫秒；停止输入这么久之后才发起搜索
+
+    # 窗口第一次绘制完成后发射一次，main.py 在此之后才打开数据库
+    first_painted = QtCore.pyqtSignal()
+
+    def __init__(self, task_manager=None):
+        """task_manager 可以稍后通过 set_task_manager 提供，在此之前所有操作按钮处于禁用状态"""
         super().__init__()
         self.setWindowTitle("任务单 App")
         self.setGeometry(100, 100, 400, 300)
         self.task_manager = task_manager
+        # 所有数据库操作都交给后台线程执行，界面不会因为查询而卡住
+        self.worker = TaskWorker(task_manager, parent=self)
+        self._painted = False
+        self.category_window = None  # 非模态的分类窗口，保存引用以免被回收
 
         # Main Layout
         layout = QtWidgets.QVBoxLayout()
@@ -30,26 +48,96 @@ class MainWindow(QtWidgets.QWidget):
         view_category_tasks_button.clicked.connect(self.open_category_window)
         layout.addWidget(view_category_tasks_button)
 
+        # 搜索框：输入时重新计时，停止输入 SEARCH_DELAY 毫秒后在后台搜索，结果显示在下方列表中
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索任务标题或描述")
+        self.search_input.setClearButtonEnabled(True)
+        layout.addWidget(self.search_input)
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self._search_sequence = 0  # 只显示最后一次搜索的结果，先发出但后返回的旧结果直接丢弃
+
+        self.search_model = TaskListModel([], batch_size=task_config.PAGE_SIZE, parent=self)
+        self.search_results = QtWidgets.QListView()
+        self.search_results.setModel(self.search_model)
+        self.search_results.setItemDelegate(TaskDelegate(self.search_results))
+        self.search_results.setUniformItemSizes(True)
+        self.search_results.doubleClicked.connect(self.view_search_result)
+        self.search_results.setVisible(False)
+        layout.addWidget(self.search_results)
+
+        # 后台有数据库操作时显示加载状态
+        self.status_label = QLabel("")
+        self.worker.busy_changed.connect(lambda busy: self.status_label.setText("加载中…" if busy else ""))
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)
+        self.controls = (create_task_button, view_today_tasks_button, view_category_tasks_button, self.search_input)
+        for control in self.controls:
+            control.setEnabled(task_manager is not None)
+
+    def set_task_manager(self, task_manager):
+        """数据库在后台打开完成后调用，启用所有操作"""
+        self.task_manager = task_manager
+        self.worker.task_manager = task_manager
+        for control in self.controls:
+            control.setEnabled(True)
+
+    def show_startup_error(self, error):
+        QMessageBox.critical(self, "数据库错误", f"打开数据库时发生错误：{error}")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            # 排队到本次绘制结束之后再处理，避免在绘制过程中执行耗时操作
+            QtCore.QTimer.singleShot(0, self.first_painted.emit)
 
     def open_create_task(self):
-        create_task_window = TaskFormDialog(self.task_manager)
+        create_task_window = TaskFormDialog(self.task_manager, worker=self.worker)
         create_task_window.exec_()  # 模态方式打开窗口
 
     def view_today_tasks(self):
-        tasks = self.task_manager.get_today_tasks()
-        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager)
+        # 按页惰性加载今日任务，列表滚动到底部时才在后台查询下一页
+        criteria = self.task_manager.today_criteria()
+        tasks = self.task_manager.iter_tasks_paged(criteria)
+        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager, worker=self.worker,
+                                     criteria=criteria)
         task_window.exec_()
 
+    def run_search(self):
+        query = self.search_input.text().strip()
+        self._search_sequence += 1
+        if not query:
+            self.show_search_results(self._search_sequence, [])
+            return
+        sequence = self._search_sequence
+        self.worker.submit("search_tasks", query, on_result=lambda tasks: self.show_search_results(sequence, tasks),
+                           on_error=lambda e: logger.error("Error searching tasks: %s", e, exc_info=e))
+
+    def show_search_results(self, sequence, tasks):
+        if sequence != self._search_sequence:
+            return
+        self.search_model.reset(tasks)
+        self.search_results.setVisible(bool(self.search_input.text().strip()))
+
+    def view_search_result(self, index):
+        TaskDescriptionDialog(self.search_model.task_at(index.row())).exec_()
+
     def open_category_window(self):
-        # 打开分类查看菜单
-        category_window = CategoryWindow(self.task_manager)
-        category_window.show()
+        # 打开分类查看菜单（非模态）；保存引用，否则窗口会在方法返回后被回收。已经打开时只把它提到前面
+        if self.category_window is None or not self.category_window.isVisible():
+            self.category_window = CategoryWindow(self.task_manager, worker=self.worker)
+        self.category_window.show()
+        self.category_window.raise_()
 
     @staticmethod
     def show_notification(task):
         """在主线程中显示通知"""
-        print(f"Notification received for task: {task.title}")
+        logger.debug("Notification received for task: %s", task.title)
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Information)
         msg.setWindowTitle("Task Reminder")
@@ -62,10 +150,13 @@ class MainWindow(QtWidgets.QWidget):
         # sound.play()
 
 class TaskFormDialog(QDialog):
-    def __init__(self, task_manager, task=None):
+    RECURRENCE_CHOICES = ("不重复", "每天", "每周", "每 N 天")
+
+    def __init__(self, task_manager, task=None, worker=None):
         super().__init__()
         self.task_manager = task_manager
         self.task = task
+        self.worker = worker or TaskWorker(task_manager, parent=self)
 
         self.setWindowTitle("编辑任务" if task else "新任务")
         layout = QVBoxLayout(self)
@@ -108,15 +199,82 @@ class TaskFormDialog(QDialog):
         layout.addWidget(QLabel("任务类型"))
         layout.addWidget(self.type_combo)
 
-        # 创建或保存按钮
-        action_button = QPushButton("保存" if task else "创建")
-        action_button.clicked.connect(self.save_task)
-        layout.addWidget(action_button)
+        # 重复规则：不重复、每天、每周或每 N 天，可选的结束日期（含当天）
+        self.recurrence_combo = QComboBox()
+        self.recurrence_combo.addItems(self.RECURRENCE_CHOICES)
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(2, 365)
+        self.interval_spin.setSuffix(" 天")
+        self.until_check = QCheckBox("重复截止日期")
+        self.until_edit = QDateEdit(datetime.now().date())
+        self.until_edit.setCalendarPopup(True)
+        if task and task.recurrence:
+            days = recurrence.interval(task.recurrence).days
+            self.recurrence_combo.setCurrentIndex({1: 1, 7: 2}.get(days, 3))
+            self.interval_spin.setValue(max(days, 2))
+        if task and task.recurrence_until:
+            self.until_check.setChecked(True)
+            self.until_edit.setDate(task.recurrence_until)
+        self.recurrence_combo.currentIndexChanged.connect(self.update_recurrence_inputs)
+        self.until_check.toggled.connect(self.update_recurrence_inputs)
+        layout.addWidget(QLabel("重复"))
+        layout.addWidget(self.recurrence_combo)
+        layout.addWidget(self.interval_spin)
+        layout.addWidget(self.until_check)
+        layout.addWidget(self.until_edit)
+        self.update_recurrence_inputs()
+
+        # 提醒：截止时间前多少分钟提醒，可以填写多个，留空表示不提醒
+        self.reminders_input = QLineEdit()
+        self.reminders_input.setPlaceholderText("如 5, 60, 1440")
+        layout.addWidget(QLabel("提醒（截止前分钟数，逗号分隔）"))
+        layout.addWidget(self.reminders_input)
+        self._reminders_loaded = task is None  # 编辑任务时在后台读取已有的提醒，读取完成前不允许修改
+        if task:
+            self.reminders_input.setEnabled(False)
+            self.worker.submit("reminder_offsets", task, on_result=self.show_reminder_offsets)
+        else:
+            self.reminders_input.setText(self.format_offsets([task_config.DEFAULT_REMINDER_OFFSET]))
 
-        # TODO:自定义提醒时间和频率（当前默认ddl前5分钟发送提醒推送）
+        # 创建或保存按钮
+        self.action_button = QPushButton("保存" if task else "创建")
+        self.action_button.clicked.connect(self.save_task)
+        layout.addWidget(self.action_button)
 
         self.setLayout(layout)
 
+    @staticmethod
+    def format_offsets(offsets):
+        return ", ".join(str(int(offset.total_seconds() // 60)) for offset in offsets)
+
+    @staticmethod
+    def parse_offsets(text):
+        """把 "5, 60" 解析为提前量元组；格式错误时抛出 ValueError"""
+        values = text.replace("，", ",").replace(",", " ").split()
+        minutes = [int(value) for value in values]
+        if any(value < 0 for value in minutes):
+            raise ValueError("提醒的分钟数不能为负数")
+        return tuple(timedelta(minutes=value) for value in minutes)
+
+    def show_reminder_offsets(self, offsets):
+        self.reminders_input.setText(self.format_offsets(offsets))
+        self.reminders_input.setEnabled(True)
+        self._reminders_loaded = True
+
+    def update_recurrence_inputs(self, *args):
+        repeating = self.recurrence_combo.currentIndex() > 0
+        self.interval_spin.setVisible(self.recurrence_combo.currentIndex() == 3)
+        self.until_check.setVisible(repeating)
+        self.until_edit.setVisible(repeating and self.until_check.isChecked())
+
+    def recurrence_rule(self):
+        index = self.recurrence_combo.currentIndex()
+        if index == 0:
+            return None, None
+        rule = recurrence.every({1: 1, 2: 7}.get(index, self.interval_spin.value()))
+        until = self.until_edit.date().toPyDate() if self.until_check.isChecked() else None
+        return rule, until
+
     def save_task(self):
         # 获取输入的任务属性
         title = self.title_input.text()
@@ -124,87 +282,259 @@ class TaskFormDialog(QDialog):
         deadline = datetime.combine(self.date_edit.date().toPyDate(), self.time_edit.time().toPyTime())
         priority = self.priority_combo.currentText()
         task_type = self.type_combo.currentText()
+        rule, until = self.recurrence_rule()
 
         try:
+            # 已有提醒尚未读取完成时为 None，保存时保持原有的提醒不变
+            offsets = self.parse_offsets(self.reminders_input.text()) if self._reminders_loaded else None
             if self.task:  # 编辑任务
                 self.task.title = title
                 self.task.description = description
                 self.task.deadline = deadline
                 self.task.priority = priority
-                self.task.task_type = task_type
-                self.task_manager.update_task(self.task)
+                self.task.type = task_type
+                self.task.recurrence = rule
+                self.task.recurrence_until = until
+                self.task.reminder_offsets = offsets
+                operation, argument = "update_task", self.task
             else:  # 创建新任务
                 new_task = task_config.Task(title=title, description=description, deadline=deadline, priority=priority,
-                                            task_type=task_type)
-                self.task_manager.add_task(new_task)
-            self.accept()  # 成功则关闭窗口
-
+                                            task_type=task_type, recurrence=rule, recurrence_until=until,
+                                            reminder_offsets=offsets)
+                operation, argument = "add_task", new_task
         except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "任务保存错误", f"添加任务时发生错误：{e}")
+            self.show_save_error(e)
+            return
 
+        # 在后台写入数据库，完成前禁用按钮，成功则关闭窗口
+        self.action_button.setEnabled(False)
+        self.action_button.setText("保存中…")
+        self.worker.submit(operation, argument, on_result=lambda _: self.accept(), on_error=self.show_save_error)
 
-class TaskCard(QtWidgets.QWidget):
-    def __init__(self, task, task_manager: TaskManager, task_list_window):
-        super().__init__()
-        self.task = task
-        self.task_manager = task_manager
-        self.task_list_window = task_list_window
-
-        # 设置卡片布局
-        layout = QtWidgets.QVBoxLayout(self)
-
-        title_label = QtWidgets.QLabel(f"任务: {self.task.title}")
-        deadline_label = QtWidgets.QLabel(f"截止时间: {self.task.deadline.strftime('%Y-%m-%d %H:%M')}")
-        priority_label = QtWidgets.QLabel(f"优先级: {self.task.priority}")
-        type_label = QtWidgets.QLabel(f"类型: {self.task.type}")
-
-        layout.addWidget(title_label)
-        layout.addWidget(deadline_label)
-        layout.addWidget(priority_label)
-        layout.addWidget(type_label)
-
-        # 按钮 - 查看描述
-        self.view_description_button = QtWidgets.QPushButton("任务详情")
-        self.view_description_button.clicked.connect(self.view_description)
-        layout.addWidget(self.view_description_button)
-
-        # 按钮 - 修改任务
-        self.edit_button = QtWidgets.QPushButton("修改任务")
-        self.edit_button.clicked.connect(self.edit_task)
-        layout.addWidget(self.edit_button)
-
-        # 按钮 - 删除任务
-        self.delete_button = QtWidgets.QPushButton("删除任务")
-        self.delete_button.clicked.connect(self.delete_task)
-        layout.addWidget(self.delete_button)
-
-        # 按钮 - 勾选完成
-        self.complete_button = QtWidgets.QPushButton("勾选完成")
-        self.complete_button.clicked.connect(self.mark_completed)
-        layout.addWidget(self.complete_button)
+    def show_save_error(self, e):
+        self.action_button.setEnabled(True)
+        self.action_button.setText("保存" if self.task else "创建")
+        QtWidgets.QMessageBox.critical(self, "任务保存错误", f"添加任务时发生错误：{e}")
 
-        self.setLayout(layout)
 
-    def view_description(self):
-        description_dialog = TaskDescriptionDialog(self.task)
-        description_dialog.exec_()
+class ChangeSubscription(QtCore.QObject):
+    """把 TaskManager 的变化回调（在变化检测线程中调用）转换为 GUI 线程中的 changed 信号。
 
-    def edit_task(self):
-        edit_dialog = TaskFormDialog(self.task_manager, task=self.task)
-        edit_dialog.exec_()
+    父窗口关闭（finished）或被销毁（destroyed）时取消订阅。注册给 TaskManager 的回调只持有本对象的弱引用，
+    不会让窗口一直留在内存中；本对象已被回收或销毁时回调不再发射信号，并把自己移除。
+    发射信号与取消订阅互斥，取消之后检测线程不会再向已经销毁的对象发射信号。
+    """
 
-    def delete_task(self):
-        self.task_manager.delete_task(self.task)
-        self.task_list_window.tasks.remove(self.task)  # 从 TaskListWindow 的任务列表中移除
-        self.task_list_window.show_page()  # 刷新页面
-        self.deleteLater()
+    changed = QtCore.pyqtSignal(object)
 
-    def mark_completed(self):
-        self.task.state = task_config.STATE_FINISHED  # 或根据你的逻辑设置状态
-        self.task_manager.update_task(self.task)
-        self.task_list_window.tasks.remove(self.task)  # 从 TaskListWindow 的任务列表中移除
-        self.task_list_window.show_page()  # 刷新页面
-        self.deleteLater()
+    def __init__(self, task_manager, parent):
+        super().__init__(parent)
+        self.task_manager = task_manager
+        self._active = True
+        self._lock = lock = threading.Lock()
+        reference = weakref.ref(self)
+
+        def deliver(changes):
+            with lock:
+                subscription = reference()
+                if subscription is None or sip.isdeleted(subscription):
+                    task_manager.remove_change_listener(deliver)
+                elif subscription._active:
+                    subscription.changed.emit(changes)
+
+        self._callback = deliver
+        task_manager.add_change_listener(deliver)
+        parent.finished.connect(self.cancel)
+        parent.destroyed.connect(self.cancel)  # destroyed 在子对象析构之前发出，此时本对象仍然有效
+
+    def cancel(self, *args):
+        with self._lock:
+            self._active = False
+        self.task_manager.remove_change_listener(self._callback)
+
+
+class TaskListModel(QtCore.QAbstractListModel):
+    """任务列表模型：按需从任务来源中分批取出任务，视图滚动到底部时通过 fetchMore 继续加载。
+
+    给出 worker 时，每一批都在后台线程中从任务来源取出（其中可能包含数据库查询），取回后再插入模型。
+    给出 sort_key（任务来源的排序键）时，可以通过 apply_changes 只更新发生变化的行。
+    """
+
+    TaskRole = QtCore.Qt.UserRole + 1
+    loading_changed = QtCore.pyqtSignal(bool)
+
+    def __init__(self, tasks, batch_size=50, worker=None, parent=None, sort_key=None):
+        super().__init__(parent)
+        self._source = iter(tasks)  # 任意可迭代对象：列表、生成器等，只在需要时取出
+        self._tasks = []
+        self._exhausted = False
+        self._loading = False  # 同一时刻只有一个后台批次在读取任务来源
+        self.batch_size = batch_size
+        self.worker = worker
+        self.sort_key = sort_key
+        self._last_key = None  # 最后一个从任务来源取出的任务的排序键，之后的任务由 fetchMore 加载
+        self._deferred_changes = []  # 后台批次读取期间收到的变化，批次插入后再应用
+        self._generation = 0  # 任务来源的代数，reset 时加一；旧来源的批次返回时直接丢弃
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._tasks):
+            return None
+        task = self._tasks[index.row()]
+        if role == self.TaskRole:
+            return task
+        if role == QtCore.Qt.DisplayRole:
+            return task.title
+        if role == QtCore.Qt.ToolTipRole:
+            return task.description
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        if self.worker is None:
+            self._append_batch(self._next_batch(self._source), self._generation)
+            return
+        self._loading = True
+        self.loading_changed.emit(True)
+        # 后台任务绑定提交时的来源和代数：reset 之后旧任务不会再读取新的来源，它的结果也不会插入模型
+        generation = self._generation
+        self.worker.submit(self._next_batch, self._source,
+                           on_result=lambda batch: self._append_batch(batch, generation),
+                           on_error=lambda error: self._fetch_failed(error, generation))
+
+    def _next_batch(self, source):
+        return list(itertools.islice(source, self.batch_size))
+
+    def _fetch_failed(self, error, generation):
+        logger.error("Error loading tasks: %s", error, exc_info=error)
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._exhausted = True
+        self.loading_changed.emit(False)
+        self._apply_deferred_changes()
+
+    def _append_batch(self, batch, generation):
+        if generation != self._generation:
+            return  # reset 之前提交的批次
+        if self._loading:
+            self._loading = False
+            self.loading_changed.emit(False)
+        if len(batch) < self.batch_size:
+            self._exhausted = True
+        if batch:
+            first = len(self._tasks)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(batch) - 1)
+            self._tasks.extend(batch)
+            self.endInsertRows()
+            if self.sort_key is not None:
+                self._last_key = self.sort_key(batch[-1])
+        self._apply_deferred_changes()
+
+    def _apply_deferred_changes(self):
+        deferred, self._deferred_changes = self._deferred_changes, []
+        for task_ids, tasks in deferred:
+            self.apply_changes(task_ids, tasks)
+
+    def apply_changes(self, task_ids, tasks):
+        """task_ids 中的任务在其他地方被修改，tasks 为其中仍符合本列表条件的任务的最新内容。
+
+        只更新这些行：不再符合条件（已删除、已完成等）的行被移除，其余的按 sort_key 插入到新的位置；
+        排在已取出的最后一个任务之后的，留给之后的 fetchMore 从任务来源加载，避免重复。
+        """
+        if self._loading:
+            # 正在读取的批次可能包含这些任务的旧内容，等它插入后再应用
+            self._deferred_changes.append((task_ids, tasks))
+            return
+        for row in reversed(range(len(self._tasks))):
+            if self._tasks[row].id in task_ids:
+                self.remove_row(row)
+        keys = [self.sort_key(task) for task in self._tasks]
+        for task in tasks:
+            key = self.sort_key(task)
+            if not self._exhausted and (self._last_key is None or key > self._last_key):
+                continue
+            row = bisect.bisect(keys, key)
+            keys.insert(row, key)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._tasks.insert(row, task)
+            self.endInsertRows()
+
+    def reset(self, tasks):
+        """用新的任务来源替换全部内容（例如新的搜索结果），并加载第一批"""
+        self.beginResetModel()
+        self._generation += 1
+        self._source = iter(tasks)
+        self._tasks = []
+        self._exhausted = False
+        self._loading = False
+        self._last_key = None
+        self._deferred_changes = []
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def task_at(self, row):
+        return self._tasks[row]
+
+    def row_of(self, task):
+        """任务当前所在的行号；后台操作完成时行号可能已经变化，需要重新查找"""
+        for row, item in enumerate(self._tasks):
+            if item is task:
+                return row
+        return None
+
+    def remove_row(self, row):
+        """删除一行，只通知视图这一行发生变化"""
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._tasks[row]
+        self.endRemoveRows()
+
+    def refresh_row(self, row):
+        """任务内容被修改后，只重绘这一行"""
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+
+class TaskDelegate(QtWidgets.QStyledItemDelegate):
+    """以卡片样式绘制任务：标题、截止时间、优先级和类型。只绘制可见行，不为每个任务创建控件。"""
+
+    PADDING = 8
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        if task is None:
+            return super().paint(painter, option, index)
+        painter.save()
+        if option.state & QtWidgets.QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+            painter.setPen(option.palette.highlightedText().color())
+        else:
+            painter.setPen(option.palette.text().color())
+        rect = option.rect.adjusted(self.PADDING, self.PADDING // 2, -self.PADDING, -self.PADDING // 2)
+        line_height = option.fontMetrics.lineSpacing()
+        lines = [
+            f"任务: {task.title}",
+            f"截止时间: {task.deadline.strftime('%Y-%m-%d %H:%M')}",
+            f"优先级: {task.priority}",
+            f"类型: {task.type}" + (f"    重复: {recurrence.describe(task.recurrence)}" if task.recurrence else ""),
+        ]
+        for i, line in enumerate(lines):
+            line_rect = QtCore.QRect(rect.left(), rect.top() + i * line_height, rect.width(), line_height)
+            text = option.fontMetrics.elidedText(line, QtCore.Qt.ElideRight, line_rect.width())
+            painter.drawText(line_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter, text)
+        painter.setPen(option.palette.mid().color())
+        painter.drawLine(option.rect.bottomLeft(), option.rect.bottomRight())
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(option.rect.width(), option.fontMetrics.lineSpacing() * 4 + self.PADDING)
 
 
 class TaskDescriptionDialog(QDialog):
@@ -224,23 +554,61 @@ class TaskDescriptionDialog(QDialog):
 
 
 class TaskListWindow(QtWidgets.QDialog):
-    def __init__(self, tasks, task_manager):
+    def __init__(self, tasks, task_manager, worker=None, criteria=None):
+        """
+        :param tasks: 按 (deadline, id) 排序的任务来源
+        :param criteria: tasks 对应的筛选条件。给出时，其他进程修改任务后只重新读取发生变化的任务并更新对应的行
+        """
         super().__init__()
         self.setWindowTitle("TODO LIST")
         self.setGeometry(200, 200, 400, 300)
 
-        self.tasks = tasks
         self.task_manager = task_manager
-        self.page = 0
-        self.tasks_per_page = 3  # 每页显示3个任务
+        self.worker = worker or TaskWorker(task_manager, parent=self)
+        self.criteria = criteria
+        self._changed_ids = set()  # 等待重新读取的任务 id
+        self._refreshing = False  # 同一时刻只有一个重新读取的请求，读取期间的变化合并到下一次
 
         self.layout = QtWidgets.QVBoxLayout(self)
 
-        # 显示任务卡片
-        self.card_layout = QtWidgets.QVBoxLayout()
-        self.layout.addLayout(self.card_layout)
+        # 任务列表：模型按需加载任务（每次取一页），委托只绘制可见的行，控件数量与任务数无关
+        self.model = TaskListModel(tasks, batch_size=task_config.PAGE_SIZE, worker=self.worker, parent=self,
+                                   sort_key=lambda task: (task.deadline, task.id))
+        self.list_view = QtWidgets.QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(TaskDelegate(self.list_view))
+        self.list_view.setUniformItemSizes(True)  # 所有行等高，视图无需逐行计算尺寸
+        self.list_view.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.list_view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.list_view.selectionModel().currentChanged.connect(self.update_buttons)
+        self.list_view.doubleClicked.connect(self.view_description)
+        self.layout.addWidget(self.list_view)
+
+        # 后台加载任务时显示的提示
+        self.loading_label = QLabel("加载中…")
+        self.loading_label.setVisible(False)
+        self.model.loading_changed.connect(self.loading_label.setVisible)
+        self.layout.addWidget(self.loading_label)
+
+        # 操作按钮，作用于当前选中的任务
+        self.action_layout = QtWidgets.QHBoxLayout()
+        # 按钮 - 查看描述
+        self.view_description_button = QtWidgets.QPushButton("任务详情")
+        self.view_description_button.clicked.connect(self.view_description)
+        # 按钮 - 修改任务
+        self.edit_button = QtWidgets.QPushButton("修改任务")
+        self.edit_button.clicked.connect(self.edit_task)
+        # 按钮 - 删除任务
+        self.delete_button = QtWidgets.QPushButton("删除任务")
+        self.delete_button.clicked.connect(self.delete_task)
+        # 按钮 - 勾选完成
+        self.complete_button = QtWidgets.QPushButton("勾选完成")
+        self.complete_button.clicked.connect(self.mark_completed)
+        for button in (self.view_description_button, self.edit_button, self.delete_button, self.complete_button):
+            self.action_layout.addWidget(button)
+        self.layout.addLayout(self.action_layout)
 
-        # 翻页按钮
+        # 翻页按钮：按一屏滚动列表，滚动到底部时模型通过键集分页查询加载下一页
         self.pagination_layout = QtWidgets.QHBoxLayout()
         self.prev_button = QtWidgets.QPushButton("上一页")
         self.prev_button.clicked.connect(self.show_previous_page)
@@ -253,99 +621,166 @@ class TaskListWindow(QtWidgets.QDialog):
 
         self.setLayout(self.layout)
 
-        self.show_page()
-
-    def show_page(self):
-        # 清空当前卡片显示
-        for i in reversed(range(self.card_layout.count())):
-            widget = self.card_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.deleteLater()
+        self.list_view.verticalScrollBar().valueChanged.connect(self.update_buttons)
+        self.model.rowsInserted.connect(self.update_buttons)
+        self.model.rowsRemoved.connect(self.update_buttons)
+        if self.model.canFetchMore():
+            self.model.fetchMore()
+        self.update_buttons()
+
+        if criteria is not None:
+            self.changes = ChangeSubscription(task_manager, self)
+            self.changes.changed.connect(self.on_tasks_changed)
+
+    def on_tasks_changed(self, changes):
+        """任务在其他进程中被修改：只重新读取这些任务并更新对应的行，变化太多时才重新加载列表"""
+        if changes.task_ids is None:
+            self._changed_ids = set()
+            self.model.reset(self.task_manager.iter_tasks_paged(self.criteria))
+            return
+        self._changed_ids |= changes.task_ids
+        if not self._refreshing:
+            self.refresh_changed_tasks()
+
+    def refresh_changed_tasks(self):
+        task_ids, self._changed_ids = self._changed_ids, set()
+        self._refreshing = bool(task_ids)
+        if task_ids:
+            self.worker.submit("get_tasks_by_ids", task_ids, self.criteria,
+                               on_result=lambda tasks: self.show_changed_tasks(task_ids, tasks),
+                               on_error=self.refresh_failed)
+
+    def show_changed_tasks(self, task_ids, tasks):
+        self.model.apply_changes(task_ids, tasks)
+        self.update_buttons()
+        self.refresh_changed_tasks()  # 读取期间又发生的变化
+
+    def refresh_failed(self, error):
+        logger.error("Error refreshing changed tasks: %s", error, exc_info=error)
+        self._refreshing = False
+
+    def current_row(self):
+        index = self.list_view.currentIndex()
+        return index.row() if index.isValid() else None
+
+    def update_buttons(self, *args):
+        has_selection = self.current_row() is not None
+        for button in (self.view_description_button, self.edit_button, self.delete_button, self.complete_button):
+            button.setEnabled(has_selection)
+        scroll_bar = self.list_view.verticalScrollBar()
+        self.prev_button.setEnabled(scroll_bar.value() > scroll_bar.minimum())
+        self.next_button.setEnabled(scroll_bar.value() < scroll_bar.maximum() or self.model.canFetchMore())
+
+    def view_description(self, *args):
+        row = self.current_row()
+        if row is not None:
+            description_dialog = TaskDescriptionDialog(self.model.task_at(row))
+            description_dialog.exec_()
 
-        # 计算显示的任务范围
-        start = self.page * self.tasks_per_page
-        end = start + self.tasks_per_page
-        tasks_to_display = self.tasks[start:end]
+    def edit_task(self):
+        row = self.current_row()
+        if row is not None:
+            edit_dialog = TaskFormDialog(self.task_manager, task=self.model.task_at(row), worker=self.worker)
+            if edit_dialog.exec_() == QDialog.Accepted:
+                self.model.refresh_row(row)
 
-        # 为每个任务创建任务卡片并显示
-        for task in tasks_to_display:
-            card = TaskCard(task, task_manager=self.task_manager, task_list_window=self)
-            self.card_layout.addWidget(card)
+    def delete_task(self):
+        row = self.current_row()
+        if row is not None:
+            task = self.model.task_at(row)
+            self.delete_button.setEnabled(False)
+            self.worker.submit("delete_task", task, on_result=lambda _: self.remove_task(task),
+                               on_error=self.show_error)
 
-        # 更新翻页按钮状态
-        self.prev_button.setEnabled(self.page > 0)
-        self.next_button.setEnabled(end < len(self.tasks))
+    def mark_completed(self):
+        row = self.current_row()
+        if row is not None:
+            task = self.model.task_at(row)
+            self.complete_button.setEnabled(False)
+            # 已完成的任务不再显示在待办列表中；重复任务推进到下一次发生，本次同样从列表中移除
+            self.worker.submit("complete_task", task, on_result=lambda _: self.remove_task(task),
+                               on_error=self.show_error)
+
+    def remove_task(self, task):
+        """后台操作完成后，只从模型中移除这一行"""
+        row = self.model.row_of(task)
+        if row is not None:
+            self.model.remove_row(row)
+        self.update_buttons()
+
+    def show_error(self, e):
+        self.update_buttons()
+        QtWidgets.QMessageBox.critical(self, "操作失败", f"操作任务时发生错误：{e}")
 
     def show_previous_page(self):
-        if self.page > 0:
-            self.page -= 1
-            self.show_page()
+        scroll_bar = self.list_view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() - scroll_bar.pageStep())
 
     def show_next_page(self):
-        if (self.page + 1) * self.tasks_per_page < len(self.tasks):
-            self.page += 1
-            self.show_page()
+        scroll_bar = self.list_view.verticalScrollBar()
+        if scroll_bar.value() >= scroll_bar.maximum() and self.model.canFetchMore():
+            self.model.fetchMore()
+        scroll_bar.setValue(scroll_bar.value() + scroll_bar.pageStep())
 
 
 class CategoryWindow(QtWidgets.QDialog):
-    def __init__(self, task_manager: TaskManager):
+    def __init__(self, task_manager, worker=None):
         super().__init__()
         self.setWindowTitle("选择任务分类")
         self.setGeometry(150, 150, 300, 200)
 
         self.task_manager = task_manager
+        self.worker = worker or TaskWorker(task_manager, parent=self)
         self.layout = QtWidgets.QVBoxLayout(self)
 
         # 按钮 - 所有任务
-        all_tasks_button = QtWidgets.QPushButton("ALL TASKS")
-        all_tasks_button.clicked.connect(self.view_all_tasks)
-        self.layout.addWidget(all_tasks_button)
-
-        # 按钮 - 工作类任务
-        work_tasks_button = QtWidgets.QPushButton("WORK")
-        work_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_WORK))
-        self.layout.addWidget(work_tasks_button)
-
-
-        # 按钮 - 学习类任务
-        study_tasks_button = QtWidgets.QPushButton("STUDY")
-        study_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_STUDY))
-        self.layout.addWidget(study_tasks_button)
-
-        # 按钮 - 健康类任务
-        health_tasks_button = QtWidgets.QPushButton("HEALTH")
-        health_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_HEALTH))
-        self.layout.addWidget(health_tasks_button)
-
-        # 按钮 - 生活类任务
-        life_tasks_button = QtWidgets.QPushButton("LIFE")
-        life_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_LIFE))
-        self.layout.addWidget(life_tasks_button)
-
-        # 按钮 - 社交类任务
-        social_tasks_button = QtWidgets.QPushButton("SOCIALIZING")
-        social_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_SOCIALIZING))
-        self.layout.addWidget(social_tasks_button)
-
-        # 按钮 - 娱乐类任务
-        entertainment_tasks_button = QtWidgets.QPushButton("ENTERTAINMENT")
-        entertainment_tasks_button.clicked.connect(lambda: self.view_tasks_by_type(task_config.TYPE_ENTERTAINMENT))
-        self.layout.addWidget(entertainment_tasks_button)
+        self.all_tasks_button = QtWidgets.QPushButton("ALL TASKS")
+        self.all_tasks_button.clicked.connect(self.view_all_tasks)
+        self.layout.addWidget(self.all_tasks_button)
+
+        # 各分类的按钮：工作、学习、健康、生活、社交、娱乐
+        self.type_buttons = {}
+        for task_type in (task_config.TYPE_WORK, task_config.TYPE_STUDY, task_config.TYPE_HEALTH,
+                          task_config.TYPE_LIFE, task_config.TYPE_SOCIALIZING, task_config.TYPE_ENTERTAINMENT):
+            button = QtWidgets.QPushButton(task_type.upper())
+            button.clicked.connect(lambda checked, t=task_type: self.view_tasks_by_type(t))
+            self.layout.addWidget(button)
+            self.type_buttons[task_type] = button
 
         # TODO:按年月日视图查看任务
 
         # TODO:按照优先级查看任务
 
         self.setLayout(self.layout)
+        self.refresh_counts()
+        # 其他进程修改任务后刷新角标
+        self.changes = ChangeSubscription(task_manager, self)
+        self.changes.changed.connect(self.refresh_counts)
+
+    def refresh_counts(self, *args):
+        """在按钮上显示各分类的待办任务数；数字来自汇总表，不需要加载任务"""
+        self.worker.submit("pending_counts_by_type", on_result=self.show_counts,
+                           on_error=lambda e: logger.error("Error counting tasks: %s", e, exc_info=e))
+
+    def show_counts(self, counts):
+        self.all_tasks_button.setText(f"ALL TASKS ({sum(counts.values())})")
+        for task_type, button in self.type_buttons.items():
+            button.setText(f"{task_type.upper()} ({counts.get(task_type, 0)})")
 
     def view_all_tasks(self):
-        tasks = self.task_manager.get_all_tasks()
-        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager)
+        criteria = self.task_manager.all_criteria()
+        tasks = self.task_manager.iter_tasks_paged(criteria)
+        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager, worker=self.worker,
+                                     criteria=criteria)
         task_window.exec_()
+        self.refresh_counts()  # 列表中可能删除或完成了任务
 
     def view_tasks_by_type(self, task_type: str):
-        tasks = self.task_manager.get_tasks_by_type(task_type=task_type)
-        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager)
+        criteria = self.task_manager.type_criteria(task_type)
+        tasks = self.task_manager.iter_tasks_paged(criteria)
+        task_window = TaskListWindow(tasks=tasks, task_manager=self.task_manager, worker=self.worker,
+                                     criteria=criteria)
         task_window.exec_()
+        self.refresh_counts()
 
 
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+from management import PAGE_SIZE, TaskManager
+from scheduler import ReminderScheduler
+
+
+class AsyncTaskManager:
+    """TaskManager 的 asyncio 接口，供脚本和服务在不依赖 Qt 的情况下使用。
+
+    所有调用都提交到一个固定大小的线程池中执行，不会为每次调用新建线程；
+    同一个事件循环可以同时发起任意多个请求，超出线程数的请求在线程池队列中等待。
+    """
+
+    def __init__(self, task_manager: TaskManager, max_workers: int = 4, executor: ThreadPoolExecutor = None):
+        self.task_manager = task_manager
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task-db")
+
+    @classmethod
+    def open(cls, db_path: str, wal: bool = True, max_workers: int = 4, metrics=None):
+        """按数据库路径创建完整的无界面组件（DatabaseManager、ReminderScheduler、TaskManager）。
+
+        多个协程并发读取时建议使用 WAL 模式，读操作不会互相阻塞。metrics 为可选的 instrumentation.Metrics。
+        """
+        database_manager = DatabaseManager(db_path, wal=wal, metrics=metrics)
+        reminder = ReminderScheduler(database_manager)
+        return cls(TaskManager(reminder=reminder, database_manager=database_manager), max_workers=max_workers)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def add_task(self, task):
+        return await self._run(self.task_manager.add_task, task)
+
+    async def add_tasks(self, tasks):
+        return await self._run(self.task_manager.add_tasks, tasks)
+
+    async def delete_task(self, task):
+        return await self._run(self.task_manager.delete_task, task)
+
+    async def update_task(self, task):
+        return await self._run(self.task_manager.update_task, task)
+
+    async def complete_task(self, task):
+        return await self._run(self.task_manager.complete_task, task)
+
+    async def reminder_offsets(self, task):
+        return await self._run(self.task_manager.reminder_offsets, task)
+
+    async def update_tasks(self, tasks):
+        return await self._run(self.task_manager.update_tasks, tasks)
+
+    async def get_today_tasks(self):
+        return await self._run(self.task_manager.get_today_tasks)
+
+    async def get_all_tasks(self):
+        return await self._run(self.task_manager.get_all_tasks)
+
+    async def get_tasks_by_type(self, task_type: str):
+        return await self._run(self.task_manager.get_tasks_by_type, task_type)
+
+    async def search_tasks(self, query: str, criteria=None, limit=PAGE_SIZE):
+        return await self._run(self.task_manager.search_tasks, query, criteria, limit)
+
+    async def get_tasks_page(self, criteria, after=None, limit=PAGE_SIZE):
+        return await self._run(self.task_manager.get_tasks_page, criteria, after, limit)
+
+    async def iter_tasks(self, criteria=None, sort_by="deadline", order="ASC", batch_size=1000):
+        """异步逐个返回任务；每一批在线程池中从同步的流式查询中取出，内存占用恒定"""
+        tasks = self.task_manager.iter_tasks(criteria, sort_by=sort_by, order=order, batch_size=batch_size)
+        try:
+            while True:
+                batch = await self._run(lambda: list(itertools.islice(tasks, batch_size)))
+                for task in batch:
+                    yield task
+                if len(batch) < batch_size:
+                    return
+        finally:
+            # 提前退出时在线程池中关闭生成器，释放其持有的数据库游标
+            await self._run(tasks.close)
+
+    async def reminders(self):
+        """异步提醒流，代替 GUI 中的 pyqtSignal：每当有任务到达提醒时间就产出该任务。
+
+        用法: async for task in manager.reminders(): ...
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def listener(task):
+            # 提醒回调在调度线程中执行，需要线程安全地投递到事件循环
+            loop.call_soon_threadsafe(queue.put_nowait, task)
+
+        self.task_manager.reminder.add_listener(listener)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.task_manager.reminder.remove_listener(listener)
+
+    async def close(self):
+        """停止提醒线程、关闭线程池和数据库连接"""
+        await self._run(self.task_manager.reminder.stop)
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
+        self.task_manager.database_manager.close()
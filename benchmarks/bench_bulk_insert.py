@@ -0,0 +1,61 @@
+"""对比逐条 write_data 与批量 write_many（单事务 executemany）的写入耗时。
+
+逐条写入每条都是一个独立事务，行数较大时非常慢，默认只在 10k 行以内测量。
+用法: python benchmarks/bench_bulk_insert.py [--sizes 1000 10000 100000] [--loop-max 10000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from common import quiet, random_task, temp_db_path
+
+from database import DatabaseManager
+
+
+def make_tasks(rows: int):
+    rng = random.Random(7)
+    now = datetime.now()
+    return [random_task(rng, now) for _ in range(rows)]
+
+
+def time_loop(tasks):
+    with quiet():
+        db = DatabaseManager(temp_db_path())
+        start = time.perf_counter()
+        for task in tasks:
+            db.write_data(task)
+        elapsed = time.perf_counter() - start
+        db.close()
+    return elapsed
+
+
+def time_bulk(tasks):
+    with quiet():
+        db = DatabaseManager(temp_db_path())
+        start = time.perf_counter()
+        db.write_many(iter(tasks))
+        elapsed = time.perf_counter() - start
+        db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--loop-max", type=int, default=10000, help="超过该行数时跳过逐条写入的测量")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'write_data loop':>16} {'write_many':>12} {'speedup':>8}")
+    for rows in args.sizes:
+        tasks = make_tasks(rows)
+        bulk = time_bulk(tasks)
+        if rows <= args.loop_max:
+            loop = time_loop(tasks)
+            print(f"{rows:>8} {loop:>15.3f}s {bulk:>11.3f}s {loop / bulk:>7.1f}x")
+        else:
+            print(f"{rows:>8} {'skipped':>16} {bulk:>11.3f}s {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""测量从数据库加载大量任务的耗时与内存：逐行 strptime + Task() 与 Task.from_row 行工厂的对比，
+并用一个带 __dict__ 的等价类作为内存占用的参照（即引入 __slots__ 之前的 Task）。
+
+用法: python benchmarks/bench_hydration.py [--rows 100000]
+"""
+import argparse
+import sqlite3
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import populate, quiet, temp_db_path
+
+from database import TASK_COLUMNS, DatabaseManager, task_row_factory
+from task_config import Task
+
+
+class DictTask:
+    """与 Task 字段相同、但使用实例 __dict__ 存储属性的参照类。"""
+
+    def __init__(self, row):
+        (self._id, self._title, self._description, deadline, self._priority, self._type, self._state,
+         next_time, self._recurrence, self._recurrence_until) = row
+        self._deadline = datetime.fromisoformat(deadline)
+        self._next_time = datetime.fromisoformat(next_time)
+
+
+def load_dict_tasks(conn):
+    return [DictTask(row) for row in conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks")]
+
+
+def load_strptime(conn):
+    rows = conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks").fetchall()
+    return [
+        Task(id=row[0], title=row[1], description=row[2],
+             deadline=datetime.strptime(row[3], "%Y-%m-%d %H:%M:%S"),
+             priority=row[4], task_type=row[5], state=row[6],
+             next_time=datetime.strptime(row[7], "%Y-%m-%d %H:%M:%S") if row[7] else None)
+        for row in rows
+    ]
+
+
+def load_row_factory(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = task_row_factory
+    return cursor.execute(f"SELECT {TASK_COLUMNS} FROM tasks").fetchall()
+
+
+def measure(loader, conn):
+    start = time.perf_counter()
+    tasks = loader(conn)
+    elapsed = time.perf_counter() - start
+    del tasks
+    tracemalloc.start()
+    tasks = loader(conn)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, peak, len(tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    db_path = temp_db_path()
+    populate(db_path, args.rows)
+    conn = sqlite3.connect(db_path)
+    loaders = (("__dict__ reference", load_dict_tasks), ("strptime + Task()", load_strptime),
+               ("Task.from_row factory", load_row_factory))
+    for name, loader in loaders:
+        elapsed, current, peak, count = measure(loader, conn)
+        print(f"{name:22s} {count} rows: {elapsed:.3f}s, {current / count:.0f} B/task retained, "
+              f"peak {peak / 2 ** 20:.1f} MiB")
+    conn.close()
+
+    # 先以字符串格式测量，再把同一个数据库迁移为整数时间戳格式后测量
+    for epoch_time in (False, True):
+        with quiet():
+            db = DatabaseManager(db_path, epoch_time=epoch_time)
+            db.filter_data()  # 第一次调用会把已过期的任务批量标记为 Overdue，不计入稳态耗时
+            start = time.perf_counter()
+            count = len(db.filter_data())
+            elapsed = time.perf_counter() - start
+            db.close()
+        storage = "epoch" if epoch_time else "text"
+        print(f"{'filter_data (' + storage + ')':22s} {count} rows: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
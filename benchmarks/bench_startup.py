@@ -0,0 +1,95 @@
+"""测量启动路径的导入耗时，并检查是否超出预算。
+
+每个场景在新的 Python 进程中运行多次，取 -X importtime 统计的导入总耗时（含解释器启动时导入的 site 等模块）的中位数，
+并列出耗时最多的几个模块：
+  - main：`import main`，只应导入标准库（PyQt、数据库模块推迟到确定运行模式后再导入）
+  - headless：`import cli`，无界面模式需要的全部模块，且不能导入 PyQt
+  - gui：`import GUI`，界面模块（含 PyQt）的导入耗时，仅作参考，不设预算
+任一场景超出预算或 headless 导入了 PyQt 时退出码为 1，可用于 CI。
+
+用法: python benchmarks/bench_startup.py [--runs 7] [--main-budget-ms 30] [--headless-budget-ms 150] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from common import ROOT, summarize
+
+SCENARIOS = {
+    "main": "import main",
+    "headless": "import cli",
+    "gui": "import GUI",
+}
+
+# 确认模块导入后没有把 PyQt 带进来
+CHECK_QT = "; import sys; sys.exit(3 if any(m.startswith('PyQt5') for m in sys.modules) else 0)"
+
+
+def run_once(statement: str):
+    """在新进程中执行 statement，返回 (-X importtime 统计的总耗时（秒）, 各模块累计耗时, 是否导入了 PyQt)。"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement + CHECK_QT], cwd=ROOT,
+                            capture_output=True, text=True, env=dict(os.environ, QT_QPA_PLATFORM="offscreen"))
+    if result.returncode not in (0, 3):
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if match:
+            modules[match.group(4)] = (int(match.group(2)), len(match.group(3)))
+    # 缩进最少的一层是由语句直接导入的顶层模块，它们的累计耗时之和就是整条语句的导入耗时
+    top_level = min(indent for _, indent in modules.values())
+    total = sum(cumulative for cumulative, indent in modules.values() if indent == top_level) / 1e6
+    return total, {name: cumulative / 1e6 for name, (cumulative, _) in modules.items()}, result.returncode == 3
+
+
+def measure(statement: str, runs: int):
+    samples = []
+    slowest = {}
+    imports_qt = False
+    for _ in range(runs):
+        total, modules, qt = run_once(statement)
+        samples.append(total)
+        slowest = modules
+        imports_qt = imports_qt or qt
+    top = sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:8]
+    return {"import": summarize(samples), "imports_pyqt": imports_qt,
+            "slowest_modules": {name: seconds for name, seconds in top}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--main-budget-ms", type=float, default=30)
+    parser.add_argument("--headless-budget-ms", type=float, default=150)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args()
+
+    budgets = {"main": args.main_budget_ms, "headless": args.headless_budget_ms}
+    results = {name: measure(statement, args.runs) for name, statement in SCENARIOS.items()}
+
+    failed = False
+    for name, result in results.items():
+        median_ms = result["import"]["median"] * 1000
+        budget = budgets.get(name)
+        over_budget = budget is not None and median_ms > budget
+        leaks_qt = name in budgets and result["imports_pyqt"]
+        result["budget_ms"] = budget
+        result["ok"] = not (over_budget or leaks_qt)
+        failed = failed or not result["ok"]
+        if not args.json:
+            status = "OK  " if result["ok"] else "FAIL"
+            limit = f"budget {budget:.0f} ms" if budget is not None else "no budget"
+            qt = ", imports PyQt5" if result["imports_pyqt"] else ""
+            print(f"{status} {name:9s} {median_ms:7.1f} ms ({limit}{qt})")
+            for module, seconds in list(result["slowest_modules"].items())[:3]:
+                print(f"       {module:30s} {seconds * 1000:7.1f} ms")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
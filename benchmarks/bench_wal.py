@@ -0,0 +1,72 @@
+"""对比默认模式与 WAL 模式下，有写者持续写入时读操作的吞吐量。
+
+写者以固定速率写入（默认 50 次/秒，接近真实使用中的写入频率），
+避免不限速的写线程占满 GIL 而使两种模式的读吞吐量无法比较。
+
+用法: python benchmarks/bench_wal.py [--rows 5000] [--readers 4] [--seconds 3] [--write-rate 50]
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+
+from common import populate, quiet, random_task, temp_db_path
+
+import task_config
+from database import DatabaseManager
+
+
+def run(wal: bool, rows: int, readers: int, seconds: float, write_rate: float = 50):
+    db_path = temp_db_path()
+    populate(db_path, rows)
+    with quiet():
+        db = DatabaseManager(db_path, wal=wal)
+        stop = threading.Event()
+        reads = [0] * readers
+        writes = [0]
+
+        def writer():
+            rng = random.Random(1)
+            now = datetime.now()
+            while not stop.wait(1 / write_rate):
+                db.write_data(random_task(rng, now))
+                writes[0] += 1
+
+        def reader(index):
+            while not stop.is_set():
+                db.filter_data(criteria={"state": task_config.STATE_PENDING, "type": task_config.TYPE_WORK},
+                               sort_by="deadline")
+                reads[index] += 1
+
+        threads = [threading.Thread(target=writer)] + \
+                  [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close()
+    return sum(reads) / seconds, writes[0] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--write-rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    results = {}
+    for wal in (False, True):
+        results[wal] = run(wal, args.rows, args.readers, args.seconds, args.write_rate)
+        mode = "WAL    " if wal else "default"
+        print(f"{mode}: {results[wal][0]:8.1f} reads/s, {results[wal][1]:8.1f} writes/s "
+              f"({args.readers} readers, 1 writer, {args.rows} rows)")
+    print(f"read throughput gain: {results[True][0] / max(results[False][0], 1e-9):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
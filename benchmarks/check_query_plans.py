@@ -0,0 +1,47 @@
+"""检查 TaskManager 使用的各类查询是否命中索引、是否需要额外排序。
+
+EXPLAIN QUERY PLAN 中出现 "SCAN tasks"（全表扫描）或 "USE TEMP B-TREE FOR ORDER BY"（额外排序）即视为失败。
+用法: python benchmarks/check_query_plans.py
+"""
+import sys
+from datetime import datetime, time, timedelta
+
+from common import populate, quiet, temp_db_path
+
+import task_config
+from database import DatabaseManager
+
+TODAY = datetime.combine(datetime.now().date(), time.min)
+
+QUERIES = {
+    "today": ({"state": task_config.STATE_PENDING, "deadline >=": TODAY, "deadline <": TODAY + timedelta(days=1)},
+              "deadline"),
+    "all": ({"state": task_config.STATE_PENDING}, "deadline"),
+    "by type": ({"state": task_config.STATE_PENDING, "type": task_config.TYPE_WORK}, "deadline"),
+}
+
+
+def main():
+    db_path = temp_db_path()
+    populate(db_path, 1000)
+    with quiet():
+        db = DatabaseManager(db_path)
+    failures = 0
+    for name, (criteria, sort_by) in QUERIES.items():
+        plan = db.explain_query_plan(criteria, sort_by=sort_by)
+        ok = not any(step.startswith("SCAN tasks") or "TEMP B-TREE" in step for step in plan)
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name:10s} {' | '.join(plan)}")
+    # 提醒线程按 (fire_at) 索引读取一小时窗口内的提醒，再按主键联接 tasks
+    now = datetime.now()
+    plan = db.explain_reminders_plan(now - timedelta(hours=1), now + timedelta(hours=1))
+    ok = any("idx_reminders_fire_at" in step for step in plan) and not any(
+        step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan)
+    failures += not ok
+    print(f"{'OK  ' if ok else 'FAIL'} {'reminders':10s} {' | '.join(plan)}")
+    db.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
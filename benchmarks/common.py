@@ -0,0 +1,69 @@
+"""基准测试的公共工具：生成测试数据库、屏蔽业务代码的 print 输出。"""
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+
+# 允许直接以 `python benchmarks/xxx.py` 运行
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import task_config  # noqa: E402
+
+PRIORITIES = sorted(task_config.ALLOWED_PRIORITIES)
+TYPES = sorted(task_config.ALLOWED_TYPES)
+
+
+def random_task(rng: random.Random, now: datetime):
+    """生成一个截止时间分布在前后 30 天内的随机任务。"""
+    deadline = now + timedelta(minutes=rng.randint(-30 * 24 * 60, 30 * 24 * 60))
+    return task_config.Task(
+        title=f"task-{rng.randint(0, 10 ** 9)}",
+        description="benchmark task",
+        deadline=deadline.replace(microsecond=0),
+        priority=rng.choice(PRIORITIES),
+        task_type=rng.choice(TYPES),
+    )
+
+
+def temp_db_path(name: str = "bench.db"):
+    return os.path.join(tempfile.mkdtemp(prefix="todo-bench-"), name)
+
+
+def populate(db_path: str, rows: int, seed: int = 42):
+    """直接用 sqlite3 批量写入 rows 条任务，不经过 DatabaseManager，以便快速构造大数据库。"""
+    import sqlite3
+    from database import DatabaseManager
+
+    with quiet():
+        DatabaseManager(db_path).close()  # 建表
+    rng = random.Random(seed)
+    now = datetime.now()
+    fmt = "%Y-%m-%d %H:%M:%S"
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO tasks (title, description, deadline, priority, type, state, nextTime) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((t.title, t.description, t.deadline.strftime(fmt), t.priority, t.type, t.state,
+              t.next_time.strftime(fmt)) for t in (random_task(rng, now) for _ in range(rows))),
+        )
+    conn.close()
+
+
+def summarize(samples):
+    """把一组耗时（秒）汇总为 min / median / p95 / mean / max。"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {"count": count, "min": ordered[0], "median": ordered[count // 2],
+            "p95": ordered[min(count - 1, int(count * 0.95))], "mean": sum(ordered) / count, "max": ordered[-1]}
+
+
+@contextmanager
+def quiet():
+    """屏蔽业务代码中的 print，避免 stdout I/O 干扰计时。"""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        yield
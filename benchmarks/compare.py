@@ -0,0 +1,52 @@
+"""对比两次 run_suite.py 的 JSON 结果，列出各项延迟（中位数）的变化。
+
+用法: python benchmarks/compare.py baseline.json current.json [--threshold 0.1]
+只列出变化超过 threshold（默认 10%）的项目，变慢的项目以 "+" 标出；存在变慢项目时退出码为 1。
+"""
+import argparse
+import json
+import sys
+
+
+def medians(node, prefix=""):
+    """递归找出结果中所有延迟统计（含 median 字段的字典），返回 {路径: 中位数}。"""
+    found = {}
+    if isinstance(node, dict):
+        if "median" in node and "p95" in node:
+            found[prefix] = node["median"]
+        else:
+            for key, value in node.items():
+                found.update(medians(value, f"{prefix}.{key}" if prefix else key))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = medians(json.load(f)["results"])
+    with open(args.current, encoding="utf-8") as f:
+        current = medians(json.load(f)["results"])
+
+    regressions = 0
+    for name in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[name], current[name]
+        if before <= 0:
+            continue
+        change = after / before - 1
+        if abs(change) < args.threshold:
+            continue
+        regressions += change > 0
+        print(f"{'+' if change > 0 else '-'} {name:60s} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms "
+              f"({change:+.0%})")
+    for name in sorted(baseline.keys() ^ current.keys()):
+        print(f"? {name} only in {'baseline' if name in baseline else 'current'}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
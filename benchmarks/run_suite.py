@@ -0,0 +1,219 @@
+"""完整的基准测试：在 1k / 100k / 1M 行的合成数据库上测量数据库层、TaskManager 和提醒调度器，结果写成 JSON。
+
+测量项目：
+  - write_data 单条写入延迟
+  - filter_data 在 state / type / priority / 今日截止时间 四个条件所有组合下的延迟和返回行数
+  - get_today_tasks（缓存失效后的首次查询与命中缓存两种情况）
+  - _check_overdue_tasks（首次全量标记、强制检查、水位线未到时的空检查）
+  - ReminderScheduler.update / check_time 的延迟，以及 update 加载的提醒窗口占用的内存
+  - 全表 filter_data 的加载耗时与每个 Task 的内存（hydration）
+  - TaskManager.stats 从汇总表读取各分类 / 每日任务数
+  - search 全文搜索（命中很多 / 很少任务的查询，以及退化为 LIKE 扫描的短词）
+
+只依赖标准库和项目本身的无界面模块，不导入 PyQt。相同的 --seed 生成相同的数据（截止时间相对于运行时刻），
+不同时间、不同机器上的结果可以用 benchmarks/compare.py 对比。
+
+用法: python benchmarks/run_suite.py [--sizes 1000 100000 1000000] [--repeat 5] [--output results.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from common import ROOT, populate, quiet, random_task, summarize, temp_db_path
+
+import task_config
+from database import DatabaseManager
+from management import TaskManager
+from scheduler import ReminderScheduler
+
+# filter_data 的各个筛选维度；suite 会测量它们的全部 16 种组合
+FILTER_DIMENSIONS = ("state", "type", "priority", "today")
+
+
+def filter_criteria(dimensions, now):
+    criteria = {}
+    if "state" in dimensions:
+        criteria["state"] = task_config.STATE_PENDING
+    if "type" in dimensions:
+        criteria["type"] = task_config.TYPE_WORK
+    if "priority" in dimensions:
+        criteria["priority"] = task_config.PRIORITY_HIGH
+    if "today" in dimensions:
+        start = datetime.combine(now.date(), datetime.min.time())
+        criteria["deadline >="] = start
+        criteria["deadline <"] = start + timedelta(days=1)
+    return criteria
+
+
+def time_calls(fn, repeat, setup=None):
+    """调用 fn repeat 次，返回每次耗时（秒）的统计和最后一次的返回值。setup 在每次计时前调用，不计入耗时。"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples), result
+
+
+def traced(fn):
+    """在 tracemalloc 下调用 fn，返回 (结果, 调用结束时仍占用的字节数, 峰值字节数)。"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def bench_hydration(db, repeat):
+    stats, tasks = time_calls(db.filter_data, repeat)
+    rows = len(tasks)
+    del tasks
+    tasks, current, peak = traced(db.filter_data)
+    return {"rows": rows, "latency": stats, "us_per_row": stats["median"] / max(rows, 1) * 1e6,
+            "bytes_per_task": current / max(len(tasks), 1), "peak_bytes": peak}
+
+
+def bench_filters(db, repeat, now):
+    results = {}
+    for size in range(len(FILTER_DIMENSIONS) + 1):
+        for dimensions in itertools.combinations(FILTER_DIMENSIONS, size):
+            name = "+".join(dimensions) or "none"
+            criteria = filter_criteria(dimensions, now)
+            stats, tasks = time_calls(lambda: db.filter_data(criteria, sort_by="deadline"), repeat)
+            results[name] = {"rows": len(tasks), "latency": stats}
+    return results
+
+
+def bench_search(db, repeat):
+    # 合成任务的标题形如 task-<随机数>：前者命中大量任务，后者只命中少数，"ta" 太短、无法使用 trigram 索引
+    queries = {"broad": "task-1", "narrow": "task-12345", "short": "ta"}
+    results = {}
+    for name, query in queries.items():
+        stats, tasks = time_calls(lambda: db.search(query, limit=50), repeat)
+        results[name] = {"query": query, "rows": len(tasks), "latency": stats}
+    return results
+
+
+def bench_today(task_manager, repeat):
+    cold, tasks = time_calls(task_manager.get_today_tasks, repeat, setup=task_manager.cache.invalidate)
+    task_manager.get_today_tasks()
+    cached, _ = time_calls(task_manager.get_today_tasks, repeat)
+    return {"rows": len(tasks), "cold": cold, "cached": cached}
+
+
+def bench_stats(task_manager, repeat, now):
+    start = now.date() - timedelta(days=30)
+    queries = {"by_type": (("type",), {"state": task_config.STATE_PENDING}),
+               "calendar": (("day",), {"day >=": start, "day <": start + timedelta(days=61)})}
+    results = {}
+    for name, (group_by, criteria) in queries.items():
+        stats, counts = time_calls(lambda: task_manager.stats(group_by, criteria), repeat,
+                                   setup=task_manager.cache.invalidate)
+        results[name] = {"groups": len(counts), "latency": stats}
+    return results
+
+
+def bench_overdue(db, repeat):
+    start = time.perf_counter()
+    marked = db._check_overdue_tasks(force=True)
+    first = time.perf_counter() - start
+    forced, _ = time_calls(lambda: db._check_overdue_tasks(force=True), repeat)
+    gated, _ = time_calls(db._check_overdue_tasks, repeat)
+    return {"first_marked": marked, "first_seconds": first, "forced": forced, "gated": gated}
+
+
+def bench_reminder(db, repeat):
+    scheduler = ReminderScheduler(db, autostart=False)  # 不启动后台线程，由基准测试直接调用
+    update, _ = time_calls(scheduler.update, repeat)
+    loaded = len(scheduler.reminders)  # 提醒窗口内的提醒数，与待办任务总数无关
+    scheduler.reminders = []
+    scheduler._entries = {}
+    _, current, peak = traced(scheduler.update)
+    check, _ = time_calls(scheduler.check_time, repeat)
+    return {"loaded": loaded, "update": update, "check_time": check,
+            "heap_bytes": current, "update_peak_bytes": peak}
+
+
+def bench_writes(db, count, now):
+    rng = random.Random(11)
+    tasks = [random_task(rng, now) for _ in range(count)]
+    it = iter(tasks)
+    stats, _ = time_calls(lambda: db.write_data(next(it)), count)
+    return {"count": count, "latency": stats}
+
+
+def run_size(rows, args):
+    db_path = temp_db_path(f"tasks-{rows}.db")
+    start = time.perf_counter()
+    populate(db_path, rows, seed=args.seed)
+    result = {"rows": rows, "populate_seconds": time.perf_counter() - start}
+    now = datetime.now()
+    repeat = args.repeat if rows < 1000000 else max(1, args.repeat // 2)  # 百万行时减少重复次数
+
+    with quiet():
+        db = DatabaseManager(db_path)
+        # 先测过期检查：数据库刚生成时所有任务都是 Pending，首次检查会把已过期的任务全部标记
+        result["check_overdue"] = bench_overdue(db, repeat)
+        result["hydration"] = bench_hydration(db, repeat)
+        result["filter_data"] = bench_filters(db, repeat, now)
+        result["search"] = bench_search(db, repeat)
+        task_manager = TaskManager(reminder=ReminderScheduler(db, autostart=False), database_manager=db)
+        result["get_today_tasks"] = bench_today(task_manager, repeat)
+        result["stats"] = bench_stats(task_manager, repeat, now)
+        result["reminder"] = bench_reminder(db, repeat)
+        result["write_data"] = bench_writes(db, args.writes, now)
+        db.close()
+    shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)  # 百万行的数据库约上百 MB，用完即删
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "machine": platform.machine()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5, help="每项测量的重复次数")
+    parser.add_argument("--writes", type=int, default=200, help="write_data 测量的写入条数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="结果 JSON 的路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "parameters": vars(args), "results": {}}
+    for rows in args.sizes:
+        report["results"][str(rows)] = run_size(rows, args)
+        print(f"finished {rows} rows", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
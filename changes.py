@@ -0,0 +1,88 @@
+"""跨进程的任务变化检测，不依赖 Qt。
+
+第二个应用实例、命令行脚本等写入同一个 tasks.db 后，本进程的提醒堆、查询缓存和打开的任务列表需要随之更新。
+ChangeWatcher 在后台线程中定期检查 PRAGMA data_version（不读取任何表，几乎没有代价），
+只有它变化时才查询 change_log 中新增的变更，把涉及的任务 id 交给回调，由回调只刷新这些任务。
+同一个 DatabaseManager 自己的写入也会改变 data_version，但 changes_since 会跳过它们，不会重复处理。
+"""
+import logging
+import sqlite3
+import threading
+from collections import namedtuple
+
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# version 为已处理到的变更版本号；task_ids 为发生变化的任务 id 集合，为 None 时表示变化太多或无法确定，应完整刷新
+Changes = namedtuple("Changes", ("version", "task_ids"))
+
+
+class ChangeWatcher:
+    """定期检查数据库是否被其他连接修改，发现变化时调用通过 add_listener 注册的回调（在检测线程中调用）。"""
+
+    def __init__(self, database_manager, interval: float = 1.0, max_delta: int = 500, autostart: bool = True):
+        """
+        :param interval: 检查间隔（秒）
+        :param max_delta: 一次变化涉及的任务超过这么多时不再逐个刷新，回调收到 task_ids=None
+        :param autostart: 是否立即启动检测线程；为 False 时需在注册好回调后调用 start()
+        """
+        self.database = database_manager
+        self.metrics = database_manager.metrics
+        self.interval = interval
+        self.max_delta = max_delta
+        self.version = database_manager.change_version()  # 只关心创建之后的变化
+        self._data_version = None
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        if autostart:
+            self._thread.start()
+
+    def add_listener(self, callback):
+        """注册回调，参数为 Changes"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    @timed
+    def poll(self):
+        """检查一次。有变化时调用回调并返回 Changes，否则返回 None"""
+        data_version = self.database.data_version()
+        if data_version == self._data_version:
+            return None
+        self._data_version = data_version
+        version, task_ids = self.database.changes_since(self.version, self.max_delta)
+        self.version = version
+        if task_ids is not None and not task_ids:
+            return None  # 只有本进程自己的写入（写入时已经在本地处理过），或写入没有修改任务
+        changes = Changes(version, frozenset(task_ids) if task_ids is not None else None)
+        logger.debug("Detected changes up to version %d: %s.", version,
+                     "full refresh" if task_ids is None else f"{len(task_ids)} task(s)")
+        for listener in list(self._listeners):
+            listener(changes)
+        return changes
+
+    def start(self):
+        self._stop.clear()
+        if not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():  # autostart=False 时线程可能从未启动
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                # 其他进程长时间持有写锁等情况，下一次再检查
+                logger.warning("Change detection failed: %s", e)
+            except Exception:
+                logger.exception("Error handling task changes.")
+            self._stop.wait(self.interval)
@@ -0,0 +1,228 @@
+"""无界面的命令行入口，不导入 PyQt，可在服务器、脚本或定时任务中使用。
+
+用法:
+    python cli.py [--db tasks.db] today
+    python cli.py all
+    python cli.py type Work
+    python cli.py search 周报
+    python cli.py add "写周报" --deadline "2024-12-31 18:00" --priority High --type Work
+    python cli.py add "晨跑" --deadline "2024-12-01 07:00" --repeat daily --until 2024-12-31
+    python cli.py add "答辩" --deadline "2024-12-20 14:00" --remind 15 60 1440   # 截止前 15 分钟、1 小时、1 天提醒
+    python cli.py range 2024-12-01 2024-12-08   # 列出日期范围内的任务，重复任务按每次发生展开
+    python cli.py watch            # 持续运行，到达提醒时间时输出提醒，其他进程修改的任务随之更新
+    python cli.py export tasks.csv [--state Pending] [--type Work]   # 导出为 CSV（.jsonl 为 JSONL，- 为标准输出）
+    python cli.py import tasks.jsonl [--chunk-size 10000] [--strict]  # 从 CSV / JSONL 导入（- 为标准输入）
+也可以通过 python main.py --headless <子命令> 调用。
+"""
+import argparse
+import sys
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import recurrence
+import task_config
+import task_io
+from changes import ChangeWatcher
+from database import DatabaseManager
+from instrumentation import configure_logging
+from management import TaskManager
+from scheduler import ReminderScheduler
+
+DEFAULT_DB_PATH = "tasks.db"
+
+
+def format_task(task):
+    repeat = f"  ({recurrence.describe(task.recurrence)})" if task.recurrence else ""
+    return (f"{task.id:>6}  {task.deadline:%Y-%m-%d %H:%M}  {task.priority:<6}  {task.type:<13}  "
+            f"{task.state:<8}  {task.title}{repeat}")
+
+
+def print_tasks(tasks):
+    count = 0
+    for task in tasks:
+        print(format_task(task))
+        count += 1
+    print(f"{count} task(s).", file=sys.stderr)
+
+
+def parse_deadline(value: str) -> datetime:
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid deadline {value!r}, expected YYYY-MM-DD [HH:MM[:SS]]")
+
+
+def cmd_today(task_manager, args):
+    print_tasks(task_manager.iter_tasks_paged(task_manager.today_criteria()))
+
+
+def cmd_all(task_manager, args):
+    print_tasks(task_manager.iter_tasks_paged(task_manager.all_criteria()))
+
+
+def cmd_type(task_manager, args):
+    print_tasks(task_manager.iter_tasks_paged(task_manager.type_criteria(args.task_type)))
+
+
+def cmd_range(task_manager, args):
+    print_tasks(task_manager.iter_tasks_in_range(args.start, args.end))
+
+
+def parse_rule(value: str) -> str:
+    try:
+        recurrence.interval(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def parse_date(value: str):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def parse_minutes(value: str) -> int:
+    if not value.isdigit():
+        raise argparse.ArgumentTypeError(f"invalid reminder offset {value!r}, expected minutes before the deadline")
+    return int(value)
+
+
+def cmd_search(task_manager, args):
+    print_tasks(task_manager.search_tasks(" ".join(args.query), limit=args.limit))
+
+
+def cmd_add(task_manager, args):
+    task = task_config.Task(title=args.title, description=args.description, deadline=args.deadline,
+                            priority=args.priority, task_type=args.type, recurrence=args.repeat,
+                            recurrence_until=args.until,
+                            reminder_offsets=None if args.remind is None else
+                            [timedelta(minutes=minutes) for minutes in args.remind])
+    task_manager.add_task(task)
+    print("Task added.", file=sys.stderr)
+
+
+def open_stream(path: str, mode: str):
+    """打开导入导出文件，"-" 表示标准输入 / 标准输出"""
+    if path == "-":
+        return nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, newline="", encoding="utf-8")  # csv 模块要求 newline=""
+
+
+def cmd_export(task_manager, args):
+    criteria = {}
+    if args.state:
+        criteria["state"] = args.state
+    if args.type:
+        criteria["type"] = args.type
+    progress = task_io.Progress("exported")
+    with open_stream(args.path, "w") as stream:
+        task_io.export_tasks(task_manager, stream, task_io.detect_format(args.path, args.format), criteria,
+                             progress=progress)
+    progress.finish()
+
+
+def cmd_import(task_manager, args):
+    progress = task_io.Progress("imported")
+    with open_stream(args.path, "r") as stream:
+        try:
+            _, rejected = task_io.import_tasks(task_manager, stream, task_io.detect_format(args.path, args.format),
+                                               chunk_size=args.chunk_size, strict=args.strict, progress=progress)
+        except ValueError as e:
+            progress.finish()
+            raise SystemExit(f"Import stopped: {e}")
+    progress.finish(f", {rejected:,} invalid row(s) skipped" if rejected else "")
+
+
+def cmd_watch(task_manager, args):
+    reminder = task_manager.reminder
+    reminder.add_listener(lambda task: print(f"[reminder] {format_task(task)}", flush=True))
+    reminder.start()
+    # 应用或其他命令修改任务后，只重新读取这些任务的提醒
+    watcher = ChangeWatcher(task_manager.database_manager, autostart=False)
+    watcher.add_listener(task_manager.apply_changes)
+    watcher.start()
+    print("Watching for reminders, press Ctrl+C to stop.", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="任务单命令行工具（不依赖 PyQt）")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="数据库文件路径")
+    parser.add_argument("--wal", action="store_true", help="以 WAL 模式打开数据库")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("today", help="列出今日待办任务").set_defaults(handler=cmd_today)
+    subparsers.add_parser("all", help="列出全部待办任务").set_defaults(handler=cmd_all)
+
+    type_parser = subparsers.add_parser("type", help="列出某一类型的待办任务")
+    type_parser.add_argument("task_type", choices=sorted(task_config.ALLOWED_TYPES))
+    type_parser.set_defaults(handler=cmd_type)
+
+    range_parser = subparsers.add_parser("range", help="列出 [start, end) 日期范围内的待办任务，展开重复任务")
+    range_parser.add_argument("start", type=parse_deadline)
+    range_parser.add_argument("end", type=parse_deadline)
+    range_parser.set_defaults(handler=cmd_range)
+
+    search_parser = subparsers.add_parser("search", help="按标题和描述搜索任务")
+    search_parser.add_argument("query", nargs="+")
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.set_defaults(handler=cmd_search)
+
+    add_parser = subparsers.add_parser("add", help="添加任务")
+    add_parser.add_argument("title")
+    add_parser.add_argument("--deadline", type=parse_deadline, required=True, help="YYYY-MM-DD [HH:MM[:SS]]")
+    add_parser.add_argument("--priority", choices=sorted(task_config.ALLOWED_PRIORITIES),
+                            default=task_config.PRIORITY_MEDIUM)
+    add_parser.add_argument("--type", choices=sorted(task_config.ALLOWED_TYPES), default=task_config.TYPE_WORK)
+    add_parser.add_argument("--description", default="")
+    add_parser.add_argument("--repeat", type=parse_rule, help='重复规则: daily、weekly 或 "every N days"')
+    add_parser.add_argument("--until", type=parse_date, help="重复的最后日期 YYYY-MM-DD")
+    add_parser.add_argument("--remind", type=parse_minutes, nargs="*", metavar="MINUTES",
+                            help="截止前多少分钟提醒，可以给出多个；不给出数值表示不提醒，默认提前 5 分钟")
+    add_parser.set_defaults(handler=cmd_add)
+
+    export_parser = subparsers.add_parser("export", help="流式导出任务为 CSV 或 JSONL")
+    export_parser.add_argument("path", help="输出文件，- 表示标准输出")
+    export_parser.add_argument("--format", choices=task_io.FORMATS, help="默认按扩展名判断")
+    export_parser.add_argument("--state", choices=sorted(task_config.ALLOWED_STATES), help="只导出该状态的任务")
+    export_parser.add_argument("--type", choices=sorted(task_config.ALLOWED_TYPES), help="只导出该类型的任务")
+    export_parser.set_defaults(handler=cmd_export)
+
+    import_parser = subparsers.add_parser("import", help="从 CSV 或 JSONL 流式导入任务")
+    import_parser.add_argument("path", help="输入文件，- 表示标准输入")
+    import_parser.add_argument("--format", choices=task_io.FORMATS, help="默认按扩展名判断")
+    import_parser.add_argument("--chunk-size", type=int, default=10000, help="每个事务写入的任务数")
+    import_parser.add_argument("--strict", action="store_true", help="遇到不合法的行时停止（已提交的块保留），默认跳过")
+    import_parser.set_defaults(handler=cmd_import)
+
+    subparsers.add_parser("watch", help="持续运行并输出到期提醒").set_defaults(handler=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging()
+    database_manager = DatabaseManager(args.db, wal=args.wal)
+    # 一次性命令不需要提醒线程；watch 在注册好输出回调后再启动
+    reminder = ReminderScheduler(database_manager, autostart=False)
+    task_manager = TaskManager(reminder=reminder, database_manager=database_manager)
+    try:
+        args.handler(task_manager, args)
+    finally:
+        reminder.stop()
+        database_manager.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
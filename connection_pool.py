@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """按线程复用的 SQLite 连接池。
+
+    每个线程第一次访问时建立一个连接，之后在 DatabaseManager 的整个生命周期内复用，
+    连接已关闭或损坏时丢弃该连接，下次访问自动重连。close() 会关闭所有线程持有的连接。
+    wal=True 时所有连接开启 WAL 日志模式，并额外提供一个专用的写连接 writer()。
+    """
+
+    def __init__(self, db_path: str, timeout: float = 5.0, wal: bool = False):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.wal = wal
+        self._writer = None
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> (thread, connection)
+        self._registry_lock = threading.Lock()
+        self._closed = False
+        self._stats = {"connects": 0, "reuses": 0, "reconnects": 0, "errors": 0}
+
+    def _connect(self):
+        # 所有连接都登记在 _connections 中，以便在主线程统一关闭，因此关闭 check_same_thread
+        conn = self._open()
+        thread = threading.current_thread()
+        with self._registry_lock:
+            # 顺便回收已经退出的线程遗留的连接
+            for ident, (owner, stale) in list(self._connections.items()):
+                if not owner.is_alive():
+                    stale.close()
+                    del self._connections[ident]
+            self._connections[thread.ident] = (thread, conn)
+            self._stats["connects"] += 1
+        return conn
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        if self.wal:
+            # WAL 模式下读不阻塞写、写不阻塞读；synchronous=NORMAL 在 WAL 下仍能保证数据库一致性
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _discard(self, conn):
+        """丢弃当前线程的连接，下次访问时重新建立。"""
+        self._local.conn = None
+        with self._registry_lock:
+            self._connections.pop(threading.get_ident(), None)
+            self._stats["reconnects"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        """返回当前线程的连接，不存在时新建。"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool has been closed.")
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        else:
+            with self._registry_lock:
+                self._stats["reuses"] += 1
+        return conn
+
+    def _drop_writer(self, conn):
+        self._writer = None
+        with self._registry_lock:
+            self._stats["reconnects"] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def _transaction(self, conn, discard):
+        try:
+            with conn:
+                yield conn
+        except sqlite3.Error as e:
+            with self._registry_lock:
+                self._stats["errors"] += 1
+            # 语句层面的错误（如约束冲突）和锁等待超时（database is locked / busy）不影响连接本身，
+            # 事务已经回滚，连接继续复用；只有连接已关闭或可能已损坏时才重连
+            if not isinstance(e, (sqlite3.IntegrityError, sqlite3.OperationalError)):
+                discard(conn)
+            raise
+
+    def connection(self):
+        """以事务方式使用当前线程的连接：正常退出时提交，异常时回滚；连接级错误会触发重连。"""
+        return self._transaction(self.acquire(), self._discard)
+
+    def writer(self):
+        """以事务方式使用专用的写连接。调用方负责用锁保证同一时刻只有一个写者。"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool has been closed.")
+        if self._writer is None:
+            self._writer = self._open()
+            with self._registry_lock:
+                self._stats["connects"] += 1
+        else:
+            with self._registry_lock:
+                self._stats["reuses"] += 1
+        return self._transaction(self._writer, self._drop_writer)
+
+    def dedicated(self):
+        """新建一个不进入连接池的独立连接，供需要长时间保持游标的流式读取使用，由调用方负责关闭。"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool has been closed.")
+        with self._registry_lock:
+            self._stats["connects"] += 1
+        return self._open()
+
+    def close(self):
+        """关闭池中所有连接，之后不再允许获取连接。"""
+        with self._registry_lock:
+            self._closed = True
+            for _, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._local = threading.local()
+
+    def stats(self):
+        """返回连接池统计：新建连接数、复用次数（即节省的 connect 次数）、重连次数与错误数。"""
+        with self._registry_lock:
+            stats = dict(self._stats)
+            stats["open"] = len(self._connections) + (self._writer is not None)
+        stats["saved_connects"] = stats["reuses"]
+        return stats
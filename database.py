@@ -1,38 +1,128 @@
+import itertools
+import logging
 import sqlite3
 import threading
-from datetime import datetime
-from typing import Dict
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable
+import task_config
 from task_config import Task
+from connection_pool import ConnectionPool
+import migrations
+import recurrence
+from instrumentation import Metrics, TimedLock, timed, timer
+
+logger = logging.getLogger(__name__)
+
+# filter_data 的筛选条件键可以以比较运算符结尾，如 {"deadline >=": start}，未带运算符时为等值比较；
+# "in" 的值为列表，如 {"id in": [1, 2, 3]}
+COMPARISON_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "in")
+
+# 时间列以字符串存储时的格式
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 查询任务时选取的列，顺序与 Task.from_row 一致
+TASK_COLUMNS = "id, title, description, deadline, priority, type, state, nextTime, recurrence, recurrence_until"
+
+# 与其他表联接查询时使用的带表名的列
+QUALIFIED_TASK_COLUMNS = ", ".join(f"tasks.{column}" for column in TASK_COLUMNS.split(", "))
+
+# 列名到 Task 属性名的映射，用于从任务中取出键集分页的游标值
+TASK_ATTRIBUTES = {"id": "id", "title": "title", "description": "description", "deadline": "deadline",
+                   "priority": "priority", "type": "type", "state": "state", "nextTime": "next_time",
+                   "recurrence": "recurrence", "recurrence_until": "recurrence_until"}
+
+INSERT_TASK_SQL = '''
+    INSERT INTO tasks (title, description, deadline, priority, type, state, nextTime, recurrence, recurrence_until)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+UPDATE_TASK_SQL = '''
+    UPDATE tasks SET title=?, description=?, deadline=?, priority=?, type=?,
+    state=?, nextTime=?, recurrence=?, recurrence_until=? WHERE id=?
+'''
+
+INSERT_REMINDER_SQL = "INSERT INTO reminders (task_id, offset_seconds, fire_at) VALUES (?, ?, ?)"
+
+
+def task_row_factory(cursor, row):
+    """sqlite3 行工厂：把按 TASK_COLUMNS 顺序查询出的一行直接构造成 Task。"""
+    return Task.from_row(row)
+
+
+def epoch_task_row_factory(cursor, row):
+    """时间列以整数 Unix 时间戳存储时使用的行工厂。"""
+    return Task.from_row(row, parse_time=datetime.fromtimestamp)
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, wal: bool = False, epoch_time: bool = False, metrics: Metrics = None):
+        """
+        :param db_path: 数据库文件路径
+        :param wal: 是否启用 WAL 模式。启用后读操作并发执行、不再经过全局锁，写操作统一走一个专用写连接
+        :param epoch_time: 是否将 deadline、nextTime 以整数 Unix 时间戳存储。已有的字符串格式数据库会被就地迁移，
+            迁移后无法再退回字符串格式；数据库已是时间戳格式时无论该参数如何都按时间戳读写
+        :param metrics: 可选的 instrumentation.Metrics，记录各方法耗时、锁等待时间和慢查询；为 None 时不统计
+        """
         self.db_path = db_path
+        self.metrics = metrics
+        self.wal = wal
+        self.epoch_time = epoch_time
+        self._pool = ConnectionPool(db_path, wal=wal)  # 每个线程复用同一个连接，避免每次操作都重新 connect
         self._initialize_database()
-        self._lock = threading.Lock()  # 初始化锁
+        self._lock = threading.Lock()  # 初始化锁；WAL 模式下只用于串行化写操作
+        if metrics is not None:
+            self._lock = TimedLock(self._lock, metrics, "DatabaseManager.lock_wait")
+        # 过期检查的水位线：最早的待办任务变为过期的时刻，None 表示未知（下一次检查必定执行 UPDATE）
+        self._overdue_watermark = None
+        self._last_overdue_check = 0.0
+        self.overdue_check_interval = 60  # 秒；即使水位线未到，也至少每隔这么久检查一次
+        self._overdue_listeners = []  # 有任务被标记为过期后调用的回调，参数为被标记的任务数
+        # 本对象自己的写入在 change_log 中对应的版本号区间 [(first, last), ...]，changes_since 跳过它们
+        self._own_versions = []
+        self._own_versions_lock = threading.Lock()
+
+    def _to_db_time(self, value: datetime):
+        """将 datetime 转换为数据库中时间列的存储格式。"""
+        return int(value.timestamp()) if self.epoch_time else value.strftime(TIME_FORMAT)
+
+    def _from_db_time(self, value) -> datetime:
+        return datetime.fromtimestamp(value) if self.epoch_time else datetime.fromisoformat(value)
+
+    @property
+    def _row_factory(self):
+        return epoch_task_row_factory if self.epoch_time else task_row_factory
+
+    def _read_guard(self):
+        """读操作的锁：默认模式下与写操作共用全局锁，WAL 模式下读操作无需加锁。"""
+        return nullcontext() if self.wal else self._lock
+
+    def _write_connection(self):
+        """写操作使用的连接：WAL 模式下为唯一的专用写连接，默认模式下为当前线程的连接。"""
+        return self._pool.writer() if self.wal else self._pool.connection()
+
+    def close(self):
+        """关闭连接池中的所有连接，应用退出时调用。"""
+        self._pool.close()
+
+    def connection_stats(self):
+        """返回连接池统计信息，其中 saved_connects 为复用连接而省下的 connect 次数。"""
+        return self._pool.stats()
 
     def _initialize_database(self):
-        """Initialize the tasks table in the database if it does not exist."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                    title TEXT,
-                    description TEXT,
-                    deadline TEXT,  -- 存储为字符串格式
-                    priority TEXT,
-                    type TEXT,
-                    state TEXT,
-                    nextTime TEXT  -- 存储为字符串格式
-                )
-            ''')
-            conn.commit()
-            print("Initialized database and tasks table if not already present.")
+        """Initialize the tasks table in the database and apply pending schema migrations."""
+        with self._pool.connection() as conn:
+            migrations.migrate(conn)
+            if self.epoch_time and not migrations.uses_epoch_time(conn):
+                migrations.convert_to_epoch_time(conn)
+            self.epoch_time = migrations.uses_epoch_time(conn)
+            self.search_tokenizer = migrations.search_tokenizer(conn)  # None 表示没有全文索引
+            logger.info("Initialized database %s (schema version %d).", self.db_path, migrations.get_version(conn))
 
     def _print_data(self):
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+        with self._read_guard():
+            with self._pool.connection() as conn:
                 cursor = conn.cursor()
                 # 打印数据库全部数据
                 cursor.execute("SELECT * FROM tasks")  # 查询tasks表中所有数据
@@ -42,108 +132,267 @@ class DatabaseManager:
                 columns = [col[1] for col in cursor.fetchall()]  # 获取列名
                 print(" | ".join(columns))  # 打印列名分隔
 
-    def _check_overdue_tasks(self):
-        """Check and update the state of overdue tasks to 'OVERDUE' if they are still 'PENDING'."""
+    def _execute(self, cursor, query, params=()):
+        """执行语句并取回全部结果。开启 metrics 时，耗时超过阈值的语句连同查询计划记入慢查询日志。"""
+        if self.metrics is None:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        seconds = time.perf_counter() - start
+        if self.metrics.is_slow(seconds):
+            plan = [row[3] for row in cursor.connection.execute('EXPLAIN QUERY PLAN ' + query, params)]
+            self.metrics.record_slow_query(query, params, seconds, plan)
+        return rows
 
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+    def _executemany(self, cursor, query, seq_of_params):
+        """批量执行语句，seq_of_params 可以是生成器。开启 metrics 时整批耗时超过阈值则记入慢查询日志，
+        记录的参数和查询计划取自第一组参数。"""
+        if self.metrics is None:
+            cursor.executemany(query, seq_of_params)
+            return
+        first = []
+
+        def remember_first():
+            for params in seq_of_params:
+                if not first:
+                    first.append(params)
+                yield params
+
+        start = time.perf_counter()
+        cursor.executemany(query, remember_first())
+        seconds = time.perf_counter() - start
+        if first and self.metrics.is_slow(seconds):
+            plan = [row[3] for row in cursor.connection.execute('EXPLAIN QUERY PLAN ' + query, first[0])]
+            self.metrics.record_slow_query(query, first[0], seconds, plan)
+
+    @timed
+    def _check_overdue_tasks(self, force: bool = False):
+        """Check and update the state of overdue tasks to 'OVERDUE' if they are still 'PENDING'.
+
+        只有当最早的待办截止时间（水位线）已经过去、距离上次检查超过 overdue_check_interval 秒
+        （用于发现其他进程写入的数据），或 force=True 时才真正执行 UPDATE；
+        其余情况下直接返回，普通读操作因此不再需要写锁和提交。
+        已经过了截止时间的重复任务不会过期，而是推进到下一次发生时间；序列结束后才按普通任务标记为过期。
+        返回被标记为过期或推进到下一次发生的任务数。
+        """
+        if not force and self._overdue_watermark is not None \
+                and datetime.now() < self._overdue_watermark \
+                and time.monotonic() - self._last_overdue_check < self.overdue_check_interval:
+            return 0
+
+        with self._lock, timer(self.metrics, "DatabaseManager.overdue_sweep"):
+            with self._write_connection() as conn:
                 cursor = conn.cursor()
-                # # 打印数据库更新过程
-                # # 打印更新前的状态
-                # cursor.execute("SELECT datetime('now')")
-                # print("Current time in SQLite:", cursor.fetchone()[0])
-                # print("Before update:")
-                # cursor.execute(
-                #     "SELECT id, title, state, deadline FROM tasks WHERE state = 'Pending' AND "
-                #     "deadline < datetime('now', 'localtime')")
-                # overdue_tasks_before = cursor.fetchall()
-                # for task in overdue_tasks_before:
-                #     print(f"Task ID: {task[0]}, Title: {task[1]}, State: {task[2]}, Deadline: {task[3]}")
-                # # 执行更新
-                # cursor.execute('''
-                #                 UPDATE tasks
-                #                 SET state = 'Overdue'
-                #                 WHERE deadline < datetime('now', 'localtime')
-                #                 AND state = 'Pending'
-                #             ''')
-                # conn.commit()
-                # # 打印更新后的状态
-                # print("After update:")
-                # cursor.execute("SELECT id, title, state, deadline FROM tasks WHERE state = 'Overdue'")
-                # overdue_tasks_after = cursor.fetchall()
-                # for task in overdue_tasks_after:
-                #     print(f"Task ID: {task[0]}, Title: {task[1]}, State: {task[2]}, Deadline: {task[3]}")
-
-                print("Checked and updated overdue tasks.")
-                cursor.execute('''
+                current = datetime.now()
+                now = self._to_db_time(current)
+                advanced = self._advance_recurring(cursor, now, current)
+                self._execute(cursor, '''
                     UPDATE tasks
                     SET state = 'Overdue'
-                    WHERE deadline < datetime('now', 'localtime')
+                    WHERE deadline < ?
                     AND state = 'Pending'
-                ''')
+                ''', (now,))
+                updated = cursor.rowcount + advanced
+                # 重新计算水位线：借助 (state, deadline) 索引，MIN 只需一次索引查找
+                earliest = self._execute(cursor, "SELECT MIN(deadline) FROM tasks WHERE state = 'Pending'")[0][0]
+                versions = self._own_versions_in(cursor, updated)
                 conn.commit()
-        print("Checked and updated overdue tasks.")
+            self._add_own_versions(versions)
+            self._overdue_watermark = self._overdue_at(self._from_db_time(earliest)) if earliest else datetime.max
+            self._last_overdue_check = time.monotonic()
+        logger.debug("Checked and updated overdue tasks: %d task(s) marked overdue or advanced.", updated)
+        if updated:
+            for listener in self._overdue_listeners:
+                listener(updated)
+        return updated
+
+    def _advance_recurring(self, cursor, now, current: datetime) -> int:
+        """把截止时间已过的待办重复任务推进到晚于 current 的下一次发生时间，保持提醒提前量不变。调用方需持有写锁。"""
+        rows = self._execute(cursor, '''
+            SELECT id, deadline, nextTime, recurrence, recurrence_until FROM tasks
+            WHERE state = 'Pending' AND deadline < ? AND recurrence IS NOT NULL
+        ''', (now,))
+        updates = []
+        for task_id, deadline, next_time, rule, until in rows:
+            deadline = self._from_db_time(deadline)
+            following = recurrence.next_occurrence(deadline, rule, recurrence.parse_until(until), after=current)
+            if following is None:
+                continue  # 序列已经结束，随后和普通任务一样标记为过期
+            lead = deadline - self._from_db_time(next_time) if next_time else task_config.DEFAULT_REMINDER_OFFSET
+            updates.append((self._to_db_time(following), self._to_db_time(following - lead), task_id))
+        if updates:
+            self._executemany(cursor, "UPDATE tasks SET deadline = ?, nextTime = ? WHERE id = ?", updates)
+        return len(updates)
+
+    def _own_versions_in(self, cursor, count: int):
+        """本事务修改的 count 行任务在 change_log 中对应的版本号区间 (first, last)，没有修改时为 None。
+
+        每修改一行任务，触发器追加一条 change_log；提交前其他连接无法写入，所以区间连续、以当前最大版本号结束。
+        需在提交前调用，提交后再通过 _add_own_versions 记录（事务回滚时这些版本号可能被其他进程重新使用）。
+        """
+        if count <= 0:
+            return None
+        last = self._execute(cursor, "SELECT max(version) FROM change_log")[0][0]
+        return last - count + 1, last
+
+    def _add_own_versions(self, versions):
+        if versions is None:
+            return
+        first, last = versions
+        with self._own_versions_lock:
+            if self._own_versions and self._own_versions[-1][1] == first - 1:
+                first = self._own_versions.pop()[0]  # 与上一次写入相邻（中间没有其他进程的写入）时合并
+            self._own_versions.append((first, last))
+
+    def invalidate_overdue_watermark(self):
+        """其他进程写入任务后调用：新任务可能比水位线更早过期，下一次检查必定执行 UPDATE"""
+        with self._lock:
+            self._overdue_watermark = None
+
+    def add_overdue_listener(self, callback):
+        """注册回调，在过期检查把任务标记为 Overdue 后调用（例如让上层缓存失效）。"""
+        self._overdue_listeners.append(callback)
 
+    @staticmethod
+    def _overdue_at(deadline: datetime) -> datetime:
+        """截止时间为 deadline 的任务会被过期检查标记的最早时刻。时间只精确到秒存储，
+        而 UPDATE 使用严格小于比较，所以要到截止时间所在秒的下一秒才会过期。"""
+        return deadline.replace(microsecond=0) + timedelta(seconds=1)
+
+    def _lower_overdue_watermark(self, deadline: datetime):
+        """写入待办任务后，如果它比当前水位线更早过期，则下调水位线。调用方需持有 self._lock。"""
+        if self._overdue_watermark is not None and self._overdue_at(deadline) < self._overdue_watermark:
+            self._overdue_watermark = self._overdue_at(deadline)
+
+    def _task_values(self, task):
+        """将任务转换为 INSERT/UPDATE 语句中 title ... recurrence_until 九列的参数。"""
+        return (
+            task.title,
+            task.description,
+            self._to_db_time(task.deadline),  # 转为存储格式
+            task.priority,
+            task.type,
+            task.state,
+            self._to_db_time(task.next_time) if task.next_time else None,  # 转为存储格式
+            task.recurrence,
+            task.recurrence_until.isoformat() if task.recurrence_until else None
+        )
+
+    def _replace_reminders(self, cursor, tasks):
+        """tasks 为 (task_id, task) 列表，用各任务的 reminder_offsets 替换其在 reminders 表中的全部提醒。
+        整批只执行两次 executemany。调用方需持有写锁并负责提交。"""
+        self._executemany(cursor, "DELETE FROM reminders WHERE task_id = ?", ((task_id,) for task_id, _ in tasks))
+        self._executemany(cursor, INSERT_REMINDER_SQL, (
+            (task_id, int(offset.total_seconds()), self._to_db_time(task.deadline - offset))
+            for task_id, task in tasks for offset in task.reminder_offsets))
+
+    @timed
     def write_data(self, task):
+        """插入一条任务，返回新任务的 id。"""
         with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._write_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO tasks (title, description, deadline, priority, type, state, nextTime)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    task.title,
-                    task.description,
-                    task.deadline.strftime("%Y-%m-%d %H:%M:%S"),  # 转为字符串
-                    task.priority,
-                    task.type,
-                    task.state,
-                    task.next_time.strftime("%Y-%m-%d %H:%M:%S") if task.next_time else None  # 转为字符串
-                ))
+                self._execute(cursor, INSERT_TASK_SQL, self._task_values(task))
+                task_id = cursor.lastrowid
+                if task.reminder_offsets is not None:
+                    self._replace_reminders(cursor, [(task_id, task)])
+                versions = self._own_versions_in(cursor, 1)
                 conn.commit()
-        print(f"Inserted task: {task.title} into the database.")
+            self._add_own_versions(versions)
+            if task.state == task_config.STATE_PENDING:
+                self._lower_overdue_watermark(task.deadline)
+        logger.debug("Inserted task %d: %s into the database.", task_id, task.title)
+        return task_id
+
+    @timed
+    def write_many(self, tasks: Iterable[Task]) -> int:
+        """在一个事务中批量插入任务，返回插入的条数。tasks 可以是生成器，不会被整体载入内存。"""
+        earliest = [datetime.max]  # 本批待办任务中最早的截止时间，用于写入后下调过期检查水位线
+        customized = []  # (在本批中的序号, 任务)，这些任务设置了自定义提醒
+
+        def rows():
+            for index, task in enumerate(tasks):
+                if task.state == task_config.STATE_PENDING and task.deadline < earliest[0]:
+                    earliest[0] = task.deadline
+                if task.reminder_offsets is not None:
+                    customized.append((index, task))
+                yield self._task_values(task)
 
+        with self._lock:
+            with self._write_connection() as conn:
+                cursor = conn.cursor()
+                self._executemany(cursor, INSERT_TASK_SQL, rows())
+                count = cursor.rowcount
+                if customized:
+                    # 同一事务中插入的行 id 连续（AUTOINCREMENT 且写锁期间没有其他写入），由最后一行的 id 倒推
+                    first_id = self._execute(cursor, "SELECT last_insert_rowid()")[0][0] - count + 1
+                    self._replace_reminders(cursor, [(first_id + index, task) for index, task in customized])
+                versions = self._own_versions_in(cursor, count)
+                conn.commit()
+            self._add_own_versions(versions)
+            if earliest[0] < datetime.max:
+                self._lower_overdue_watermark(earliest[0])
+        logger.debug("Inserted %d task(s) into the database.", count)
+        return count
+
+    @timed
     def read_data(self, task_id: int):
         self._check_overdue_tasks()
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+        with self._read_guard():
+            with self._pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-                row = cursor.fetchone()
-                if row:
-                    print(f"Read task: {task_id} from the database.")
-                    return Task(
-                        id=row[0],
-                        title=row[1],
-                        description=row[2],
-                        deadline=datetime.strptime(row[3], "%Y-%m-%d %H:%M:%S"),  # 转换为 datetime
-                        priority=row[4],
-                        task_type=row[5],
-                        state=row[6],
-                        next_time=datetime.strptime(row[7], "%Y-%m-%d %H:%M:%S") if row[7] else None  # 转换为 datetime
-                    )
+                cursor.row_factory = self._row_factory
+                rows = self._execute(cursor, f'SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?', (task_id,))
+                if rows:
+                    logger.debug("Read task %d from the database.", task_id)
+                    return rows[0]
             return None
 
+    @timed
     def update_data(self, task):
         self._check_overdue_tasks()
         with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._write_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE tasks SET title=?, description=?, deadline=?, priority=?, type=?, 
-                    state=?, nextTime=? WHERE id=?
-                ''', (
-                    task.title,
-                    task.description,
-                    task.deadline.strftime("%Y-%m-%d %H:%M:%S"),  # 转为字符串
-                    task.priority,
-                    task.type,
-                    task.state,
-                    task.next_time.strftime("%Y-%m-%d %H:%M:%S") if task.next_time else None,  # 转为字符串
-                    task.id
-                ))
+                self._execute(cursor, UPDATE_TASK_SQL, self._task_values(task) + (task.id,))
+                count = cursor.rowcount
+                if task.reminder_offsets is not None:
+                    self._replace_reminders(cursor, [(task.id, task)])
+                versions = self._own_versions_in(cursor, count)
                 conn.commit()
-            print(f"Updated task{task.id}: {task.title} in the database.")
+            self._add_own_versions(versions)
+            if task.state == task_config.STATE_PENDING:
+                self._lower_overdue_watermark(task.deadline)
+            logger.debug("Updated task %s: %s in the database.", task.id, task.title)
+
+    @timed
+    def update_many(self, tasks: Iterable[Task]) -> int:
+        """在一个事务中批量更新任务，返回更新的条数。"""
+        self._check_overdue_tasks()
+        customized = []  # 设置了自定义提醒的任务
+
+        def rows():
+            for task in tasks:
+                if task.reminder_offsets is not None:
+                    customized.append(task)
+                yield self._task_values(task) + (task.id,)
+
+        with self._lock:
+            with self._write_connection() as conn:
+                cursor = conn.cursor()
+                self._executemany(cursor, UPDATE_TASK_SQL, rows())
+                count = cursor.rowcount
+                if customized:
+                    self._replace_reminders(cursor, [(task.id, task) for task in customized])
+                versions = self._own_versions_in(cursor, count)
+                conn.commit()
+            self._add_own_versions(versions)
+            # 更新后的截止时间可能早于水位线，下次检查时重新计算
+            self._overdue_watermark = None
+        logger.debug("Updated %d task(s) in the database.", count)
+        return count
 
     # def filter_data(self, criteria: Dict[str, str] = None, sort_by: str = None, order: str = "ASC"):
     #     self._check_overdue_tasks()
@@ -178,74 +427,338 @@ class DatabaseManager:
     #                 ) for row in rows
     #             ]
     #             return tasks
-    def filter_data(self, criteria: Dict[str, str] = None, sort_by: str = None, order: str = "ASC"):
+    @timed
+    def filter_data(self, criteria: Dict[str, object] = None, sort_by: str = None, order: str = "ASC"):
         # 检查是否有过期任务
         self._check_overdue_tasks()
 
-        # 使用锁确保线程安全
-        with self._lock:
+        # 使用锁确保线程安全（WAL 模式下读操作并发执行，无需加锁）
+        with self._read_guard():
             # 初始查询语句
-            query = 'SELECT * FROM tasks'
+            query = f'SELECT {TASK_COLUMNS} FROM tasks'
             conditions = []
             params = []
 
             # 如果有筛选条件，构建条件部分
             if criteria:
-                print("Applying filters...")
-                for key, value in criteria.items():
-                    conditions.append(f"{key} = ?")
-                    params.append(value)
+                conditions, params = self._build_conditions(criteria)
                 query += ' WHERE ' + ' AND '.join(conditions)
 
             # 如果有排序条件，添加排序部分
             if sort_by:
-                print(f"Sorting by {sort_by} in {order.upper()} order.")
                 query += f' ORDER BY {sort_by} {order.upper()}'
 
-            # 打印最终的查询语句
-            print(f"Executing query: {query}")
-            print(f"With parameters: {params}")
+            # 记录最终的查询语句（DEBUG 级别，默认不输出）
+            logger.debug("Executing query: %s with parameters: %s", query, params)
 
             # 执行查询并返回结果
-            with sqlite3.connect(self.db_path) as conn:
+            with self._pool.connection() as conn:
                 cursor = conn.cursor()
                 try:
-                    cursor.execute(query, params)
-                    rows = cursor.fetchall()
-
-                    # 如果没有找到任何结果，打印信息
-                    if not rows:
-                        print("No tasks found matching the criteria.")
-
-                    tasks = [
-                        Task(
-                            id=row[0],
-                            title=row[1],
-                            description=row[2],
-                            deadline=datetime.strptime(row[3], "%Y-%m-%d %H:%M:%S"),  # 转换为 datetime
-                            priority=row[4],
-                            task_type=row[5],
-                            state=row[6],
-                            next_time=datetime.strptime(row[7], "%Y-%m-%d %H:%M:%S") if row[7] else None  # 转换为 datetime
-                        ) for row in rows
-                    ]
-                    print(f"Found {len(tasks)} tasks.")
+                    # 行工厂直接把每一行构造成 Task，省去中间的元组列表
+                    cursor.row_factory = self._row_factory
+                    tasks = self._execute(cursor, query, params)
+                    logger.debug("Found %d tasks.", len(tasks))
                     return tasks
                 except sqlite3.Error as e:
-                    # 捕获数据库执行错误并打印错误信息
-                    print(f"Error executing query: {e}")
+                    # 捕获数据库执行错误并记录错误信息
+                    logger.error("Error executing query %s: %s", query, e)
                     return []
 
+    @timed
+    def filter_page(self, criteria: Dict[str, object] = None, sort_by: str = "deadline", order: str = "ASC",
+                    after: tuple = None, limit: int = 50):
+        """按键集（keyset）分页查询任务。
+
+        结果按 (sort_by, id) 排序，after 为上一页最后一个任务的 (sort_by 的值, id)，为 None 时返回第一页。
+        不使用 OFFSET，借助 (state, sort_by) 索引直接定位到上一页的末尾，因此第 1000 页与第 1 页的代价相同。
+        sort_by 列不能包含 NULL。
+        """
+        self._check_overdue_tasks()
+        query, params = self._page_query(criteria, sort_by, order, after, limit)
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = self._row_factory
+                return self._execute(cursor, query, params)
+
+    @timed
+    def iter_tasks(self, criteria: Dict[str, object] = None, sort_by: str = "id", order: str = "ASC",
+                   batch_size: int = 1000):
+        """以生成器方式逐个返回符合条件的任务，内存占用与结果总数无关，适合导出、报表等批处理。
+
+        WAL 模式下读不阻塞写，使用一个独立连接保持游标打开，每次 fetchmany 取 batch_size 行；
+        默认模式下长时间打开的读游标会阻塞其他写操作，因此改为按 (sort_by, id) 键集分批查询，
+        每批之间释放锁。两种方式返回的顺序相同。
+        """
+        self._check_overdue_tasks()
+        if self.wal:
+            yield from self._iter_cursor(criteria, sort_by, order, batch_size)
+            return
+        after = None
+        attribute = TASK_ATTRIBUTES[sort_by]
+        while True:
+            batch = self.filter_page(criteria, sort_by=sort_by, order=order, after=after, limit=batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after = (getattr(batch[-1], attribute), batch[-1].id)
+
+    def _iter_cursor(self, criteria, sort_by, order, batch_size):
+        query, params = self._page_query(criteria, sort_by, order, None, -1)  # LIMIT -1 表示不限制行数
+        conn = self._pool.dedicated()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = self._row_factory
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            conn.close()
+
+    def _page_query(self, criteria, sort_by, order, after, limit):
+        order = order.upper()
+        conditions, params = self._build_conditions(criteria or {})
+        if after is not None:
+            # 行值比较 (sort_by, id) > (?, ?) 可以直接作为索引范围的起点
+            conditions.append(f"({sort_by}, id) {'>' if order == 'ASC' else '<'} (?, ?)")
+            params.extend(self._to_db_time(value) if isinstance(value, datetime) else value for value in after)
+        query = f'SELECT {TASK_COLUMNS} FROM tasks'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY {sort_by} {order}, id {order} LIMIT ?'
+        params.append(limit)
+        return query, params
+
+    def _build_conditions(self, criteria: Dict[str, object]):
+        """将筛选条件转换为 WHERE 子句片段和参数列表；datetime 类型的值转换为数据库中的存储格式，None 对应 IS [NOT] NULL。"""
+        conditions = []
+        params = []
+        for key, value in criteria.items():
+            column, _, operator = key.rpartition(" ")
+            if not column or operator not in COMPARISON_OPERATORS:
+                column, operator = key, "="
+            if value is None and operator in ("=", "!="):
+                # {"recurrence": None} 筛选空值，{"recurrence !=": None} 筛选非空值
+                conditions.append(f"{column} IS {'NOT ' if operator == '!=' else ''}NULL")
+                continue
+            if operator == "in":
+                values = list(value)
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(self._to_db_time(item) if isinstance(item, datetime) else item for item in values)
+                continue
+            conditions.append(f"{column} {operator} ?")
+            params.append(self._to_db_time(value) if isinstance(value, datetime) else value)
+        return conditions, params
+
+    def explain_query_plan(self, criteria: Dict[str, object] = None, sort_by: str = None, order: str = "ASC",
+                           after: tuple = None, limit: int = None):
+        """返回 filter_data（给出 limit 时为 filter_page）在相同参数下的 EXPLAIN QUERY PLAN 结果（detail 列），
+        用于确认查询是否命中索引。"""
+        if limit is not None:
+            query, params = self._page_query(criteria, sort_by, order, after, limit)
+        else:
+            query = f'SELECT {TASK_COLUMNS} FROM tasks'
+            params = []
+            if criteria:
+                conditions, params = self._build_conditions(criteria)
+                query += ' WHERE ' + ' AND '.join(conditions)
+            if sort_by:
+                query += f' ORDER BY {sort_by} {order.upper()}'
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+    @timed
+    def count_tasks(self, group_by=("state",), criteria: Dict[str, object] = None):
+        """从 task_counts 汇总表读取任务数，不扫描 tasks 表。
+
+        group_by 为 migrations.COUNT_COLUMNS（state、type、priority、day）中的列；criteria 只能使用这些列，
+        day 的值为 "YYYY-MM-DD" 字符串或 date，如 {"state": "Pending", "day >=": date.today()}。
+        返回 {分组值: 任务数}，只按一列分组时键为该列的值，否则为元组。
+        """
+        self._check_overdue_tasks()  # 过期检查会修改 state，先让汇总表反映最新状态
+        for column in itertools.chain(group_by, ((key.split(" ")[0]) for key in (criteria or {}))):
+            if column not in migrations.COUNT_COLUMNS:
+                raise ValueError(f"Cannot count tasks by {column!r}.")
+        criteria = {key: value.isoformat() if isinstance(value, date) else value
+                    for key, value in (criteria or {}).items()}
+        conditions, params = self._build_conditions(criteria)
+        columns = ", ".join(group_by)
+        query = f'SELECT {columns + ", " if columns else ""}SUM(count) FROM task_counts'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        if group_by:
+            query += f' GROUP BY {columns}'
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                rows = self._execute(conn.cursor(), query, params)
+        if not group_by:
+            return rows[0][0] or 0
+        if len(group_by) == 1:
+            return {row[0]: row[1] for row in rows}
+        return {tuple(row[:-1]): row[-1] for row in rows}
+
+    @timed
+    def search(self, query: str, criteria: Dict[str, object] = None, limit: int = 50):
+        """在标题和描述中搜索任务，按 bm25 相关度排序（标题中的匹配权重更高），最多返回 limit 条。
+
+        query 按空白拆分为多个词，所有词都要出现（子串匹配，不区分 ASCII 大小写）；criteria 与 filter_data 相同，
+        用于在搜索结果上再做筛选。使用 FTS5 索引时代价只与匹配的任务数有关；trigram 分词器无法索引少于三个字符的词，
+        这些词以及没有全文索引的数据库改用 LIKE 在候选任务上匹配。
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        self._check_overdue_tasks()
+        if self.search_tokenizer == "trigram":
+            indexed = [term for term in terms if len(term) >= 3]
+        else:
+            indexed = terms if self.search_tokenizer else []
+        scanned = [term for term in terms if term not in indexed]
+
+        conditions, params = self._build_conditions(criteria or {})
+        conditions = [f"tasks.{condition}" for condition in conditions]
+        for term in scanned:
+            conditions.append("(tasks.title LIKE ? ESCAPE '\\' OR tasks.description LIKE ? ESCAPE '\\')")
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params.extend((pattern, pattern))
+        if indexed:
+            # 每个词作为一个短语（双引号转义），unicode61 分词器下按前缀匹配
+            suffix = "" if self.search_tokenizer == "trigram" else "*"
+            match = " ".join('"' + term.replace('"', '""') + '"' + suffix for term in indexed)
+            sql = (f'SELECT {QUALIFIED_TASK_COLUMNS} FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid '
+                   f'WHERE tasks_fts MATCH ?')
+            params.insert(0, match)
+            if conditions:
+                sql += ' AND ' + ' AND '.join(conditions)
+            sql += ' ORDER BY bm25(tasks_fts, 10.0, 1.0) LIMIT ?'
+        else:
+            sql = f'SELECT {QUALIFIED_TASK_COLUMNS} FROM tasks WHERE ' + ' AND '.join(conditions)
+            sql += ' ORDER BY tasks.deadline ASC LIMIT ?'
+        params.append(limit)
+
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = self._row_factory
+                return self._execute(cursor, sql, params)
+
+    @timed
+    def upcoming_reminders(self, start: datetime, end: datetime, task_ids: Iterable[int] = None):
+        """返回提醒时间在 [start, end) 内的待办任务提醒，按提醒时间排序，元素为 (提醒时间, 任务)。
+
+        借助 (fire_at) 索引只读取这段时间内的提醒，代价与时间窗口内的提醒数有关，与待办任务总数无关。
+        给出 task_ids 时只返回这些任务的提醒。一个任务有多个提醒时，每个提醒各对应一个元素。
+        """
+        self._check_overdue_tasks()
+        query, params = self._reminders_query(start, end, task_ids)
+        row_factory = self._row_factory
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = lambda c, row: (self._from_db_time(row[0]), row_factory(c, row[1:]))
+                return self._execute(cursor, query, params)
+
+    def _reminders_query(self, start, end, task_ids):
+        # CROSS JOIN 固定联接顺序：先按 (fire_at) 索引取出窗口内的提醒，再按主键查找任务，
+        # 否则查询规划器可能改为先按 state 遍历全部待办任务
+        query = (f'SELECT reminders.fire_at, {QUALIFIED_TASK_COLUMNS} FROM reminders '
+                 f'CROSS JOIN tasks ON tasks.id = reminders.task_id '
+                 f'WHERE reminders.fire_at >= ? AND reminders.fire_at < ? AND tasks.state = ?')
+        params = [self._to_db_time(start), self._to_db_time(end), task_config.STATE_PENDING]
+        if task_ids is not None:
+            task_ids = list(task_ids)
+            query += f" AND reminders.task_id IN ({', '.join('?' * len(task_ids))})"
+            params.extend(task_ids)
+        return query + ' ORDER BY reminders.fire_at', params
+
+    def explain_reminders_plan(self, start: datetime, end: datetime):
+        """返回 upcoming_reminders 在相同参数下的 EXPLAIN QUERY PLAN 结果（detail 列）"""
+        query, params = self._reminders_query(start, end, None)
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+    def reminder_offsets(self, task_id: int):
+        """任务的全部提醒提前量（timedelta），从小到大排列"""
+        return self.reminder_offsets_between(task_id, task_id).get(task_id, [])
+
+    def reminder_offsets_between(self, first_id: int, last_id: int):
+        """id 在 [first_id, last_id] 内的任务的提醒提前量，返回 {task_id: [timedelta, ...]}。
+
+        借助 (task_id, offset_seconds) 唯一索引按区间读取，供导出等批处理一次取得一批任务的提醒。
+        """
+        offsets = {}
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                rows = self._execute(conn.cursor(), "SELECT task_id, offset_seconds FROM reminders "
+                                     "WHERE task_id BETWEEN ? AND ? ORDER BY task_id, offset_seconds",
+                                     (first_id, last_id))
+                for task_id, seconds in rows:
+                    offsets.setdefault(task_id, []).append(timedelta(seconds=seconds))
+        return offsets
+
+    def data_version(self) -> int:
+        """当前线程连接的 PRAGMA data_version。其他连接（包括其他进程）提交写入后该值改变，
+        读取它不需要查询任何表，用于低成本地判断是否需要查询 change_log。"""
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                return self._execute(conn.cursor(), "PRAGMA data_version")[0][0]
+
+    def change_version(self) -> int:
+        """change_log 中最新的变更版本号，没有变更时为 0"""
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                return self._execute(conn.cursor(), "SELECT max(version) FROM change_log")[0][0] or 0
+
+    @timed
+    def changes_since(self, version: int, limit: int = 500):
+        """返回 (最新版本号, 版本号大于 version 的变更涉及的任务 id 集合)。
+
+        本对象自己的写入不包括在内（调用方已经在本地处理过），只返回其他进程或其他连接的变更。
+        所需的变更已被清理，或涉及的任务超过 limit 个时，集合为 None，表示调用方应完整刷新。
+        min、max 各自单独查询，借助主键只需一次查找。
+        """
+        with self._own_versions_lock:
+            # 调用方已经处理到 version，此前的区间不再需要
+            self._own_versions = [versions for versions in self._own_versions if versions[1] > version]
+            own_versions = list(self._own_versions)
+        with self._read_guard():
+            with self._pool.connection() as conn:
+                cursor = conn.cursor()
+                first, last = self._execute(cursor, "SELECT (SELECT min(version) FROM change_log), "
+                                                    "(SELECT max(version) FROM change_log)")[0]
+                if last is None or last == version:
+                    return version, set()
+                if last < version or first > version + 1:
+                    return last, None  # 数据库被替换，或落后太多、中间的变更已被清理
+                query = "SELECT DISTINCT task_id FROM change_log WHERE version > ? AND version <= ?"
+                params = [version, last]
+                for first_own, last_own in own_versions:
+                    query += " AND version NOT BETWEEN ? AND ?"
+                    params.extend((first_own, last_own))
+                rows = self._execute(cursor, query + " LIMIT ?", params + [limit + 1])
+        if len(rows) > limit:
+            return last, None
+        return last, {row[0] for row in rows}
+
+    @timed
     def delete_data(self, task_id: int):
         """删除指定 task_id 的任务"""
         self._check_overdue_tasks()
         with self._lock:
             try:
-                with sqlite3.connect(self.db_path) as conn:
+                with self._write_connection() as conn:
                     cursor = conn.cursor()
-                    cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                    self._execute(cursor, "DELETE FROM tasks WHERE id = ?", (task_id,))
+                    versions = self._own_versions_in(cursor, cursor.rowcount)
                     conn.commit()
-                    print(f"Task with ID {task_id} deleted successfully.")
+                    logger.debug("Task with ID %s deleted successfully.", task_id)
+                self._add_own_versions(versions)
             except sqlite3.Error as e:
-                print(f"Error deleting task with ID {task_id}: {e}")
+                logger.error("Error deleting task with ID %s: %s", task_id, e)
 
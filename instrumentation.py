@@ -0,0 +1,253 @@
+"""可选的性能统计。
+
+Metrics 按操作名记录调用次数、总耗时、最大耗时和耗时直方图，并保存超过阈值的慢查询及其查询计划。
+把 Metrics 实例传给 DatabaseManager(metrics=...) 即可开启；提醒调度器使用数据库的同一个实例。
+未开启时（metrics=None）被 @timed 装饰的方法只多一次属性判断。
+
+统计结果可以通过 snapshot() 在进程内读取，也可以用 dump() / start_periodic_dump() 定期写成
+JSON 或 Prometheus 文本格式的文件。
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# 直方图的桶上界（秒），最后还有一个 +Inf 桶
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "counts")
+
+    def __init__(self, size):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.counts = [0] * size
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, slow_query_threshold: float = 0.1, slow_query_log_size: int = 100):
+        """
+        :param buckets: 直方图各桶的上界（秒），需从小到大排列
+        :param slow_query_threshold: 耗时超过该值（秒）的语句记入慢查询日志，为 None 时不记录
+        :param slow_query_log_size: 内存中保留的最近慢查询条数
+        """
+        self.buckets = tuple(buckets)
+        self.slow_query_threshold = slow_query_threshold
+        self._histograms = {}
+        self._slow_queries = deque(maxlen=slow_query_log_size)
+        self._slow_query_count = 0
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def observe(self, name: str, seconds: float):
+        """记录一次名为 name 的操作耗时。"""
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(len(self.buckets) + 1)
+            histogram.count += 1
+            histogram.total += seconds
+            if seconds > histogram.max:
+                histogram.max = seconds
+            histogram.counts[index] += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def is_slow(self, seconds: float) -> bool:
+        return self.slow_query_threshold is not None and seconds >= self.slow_query_threshold
+
+    def record_slow_query(self, query: str, params, seconds: float, plan):
+        """记录一条慢查询及其 EXPLAIN QUERY PLAN 结果，同时以 WARNING 级别写入日志。"""
+        query = " ".join(query.split())
+        entry = {"time": time.time(), "seconds": seconds, "query": query,
+                 "params": [str(param) for param in params], "plan": list(plan)}
+        with self._lock:
+            self._slow_queries.append(entry)
+            self._slow_query_count += 1
+        logger.warning("Slow query (%.1f ms): %s; plan: %s", seconds * 1000, query, " | ".join(entry["plan"]))
+
+    def slow_queries(self):
+        """返回最近的慢查询记录，按时间先后排列。"""
+        with self._lock:
+            return list(self._slow_queries)
+
+    def snapshot(self):
+        """返回当前统计的副本：{操作名: {count, sum, mean, max, buckets}}，buckets 为 {上界: 累计次数}。"""
+        with self._lock:
+            operations = {}
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+                operations[name] = {"count": histogram.count, "sum": histogram.total,
+                                    "mean": histogram.total / histogram.count, "max": histogram.max,
+                                    "buckets": buckets}
+            return {"operations": operations, "slow_queries": self._slow_query_count}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._slow_queries.clear()
+            self._slow_query_count = 0
+
+    def to_json(self) -> str:
+        snapshot = self.snapshot()
+        snapshot["recent_slow_queries"] = self.slow_queries()
+        return json.dumps(snapshot, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式，可由 node_exporter 的 textfile collector 采集。"""
+        snapshot = self.snapshot()
+        lines = ["# HELP todo_operation_seconds Latency of instrumented TODO app operations.",
+                 "# TYPE todo_operation_seconds histogram"]
+        for name, operation in snapshot["operations"].items():
+            for bound, count in operation["buckets"].items():
+                lines.append(f'todo_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {count}')
+            lines.append(f'todo_operation_seconds_sum{{operation="{name}"}} {operation["sum"]!r}')
+            lines.append(f'todo_operation_seconds_count{{operation="{name}"}} {operation["count"]}')
+        lines.append("# HELP todo_slow_queries_total Queries slower than the slow query threshold.")
+        lines.append("# TYPE todo_slow_queries_total counter")
+        lines.append(f"todo_slow_queries_total {snapshot['slow_queries']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str = None):
+        """把统计写入文件。fmt 为 "json" 或 "prometheus"，未指定时按扩展名判断（.prom 为 Prometheus）。
+        先写临时文件再替换，读取方不会看到写了一半的文件。"""
+        if fmt is None:
+            fmt = "prometheus" if path.endswith(".prom") else "json"
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def start_periodic_dump(self, path: str, interval: float = 60, fmt: str = None):
+        """启动后台线程，每隔 interval 秒调用一次 dump()。"""
+        self.stop_periodic_dump()
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                self._dump_safely(path, fmt)
+            self._dump_safely(path, fmt)  # 停止时再写一次，保留最终结果
+
+        self._dump_thread = threading.Thread(target=run, daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def _dump_safely(self, path, fmt):
+        try:
+            self.dump(path, fmt)
+        except OSError:
+            logger.exception("Failed to write metrics to %s", path)
+
+
+class TimedLock:
+    """包装一个锁，记录每次获取锁前的等待时间。"""
+
+    def __init__(self, lock, metrics: Metrics, name: str):
+        self._inner = lock
+        self._metrics = metrics
+        self._name = name
+
+    def acquire(self, blocking: bool = True, timeout: float = -1):
+        start = time.perf_counter()
+        acquired = self._inner.acquire(blocking, timeout)
+        self._metrics.observe(self._name, time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._inner.release()
+
+    def locked(self):
+        return self._inner.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def timed(method):
+    """方法装饰器：所属对象的 metrics 不为 None 时，以 "类名.方法名" 记录每次调用的耗时。
+
+    生成器方法记录的是迭代过程中生成器自身的累计耗时（不含调用方处理每个元素的时间），在生成器结束或关闭时记录一次。
+    """
+    name = method.__qualname__
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            metrics = self.metrics
+            if metrics is None:
+                return (yield from method(self, *args, **kwargs))
+            generator = method(self, *args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration as stop:
+                        return stop.value
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield item
+            finally:
+                generator.close()
+                metrics.observe(name, elapsed)
+
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def timer(metrics, name: str):
+    """metrics 为 None 时返回空的上下文管理器，用于给方法内的一段代码计时。"""
+    return nullcontext() if metrics is None else metrics.timer(name)
+
+
+def configure_logging():
+    """供 main.py 和 cli.py 使用。本模块只导入标准库，界面在首次绘制前调用它不会带入数据库等模块"""
+    # 日志级别由环境变量 TODO_LOG_LEVEL 控制（如 DEBUG、INFO），默认只输出警告和错误
+    level = os.environ.get("TODO_LOG_LEVEL", "WARNING").upper()
+    logging.basicConfig(level=getattr(logging, level, logging.WARNING),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -1,31 +1,101 @@
-from PyQt5.QtWidgets import QApplication
+import os
 import sys
-from GUI import MainWindow
-from database import DatabaseManager
-from management import TaskManager
-from notification import Reminder
+import time
+
+# 启动计时的起点；模块顶层只导入标准库，PyQt 和数据库相关模块在确定运行模式后才导入
+START_TIME = time.perf_counter()
 
 db_path = f"tasks.db"
 
 
-def main():
+def create_metrics():
+    # 设置环境变量 TODO_METRICS_FILE 时开启性能统计，每分钟写一次该文件（扩展名为 .prom 时为 Prometheus 格式）
+    path = os.environ.get("TODO_METRICS_FILE")
+    if not path:
+        return None
+    from instrumentation import Metrics
+    metrics = Metrics(slow_query_threshold=float(os.environ.get("TODO_SLOW_QUERY_MS", "100")) / 1000)
+    metrics.start_periodic_dump(path, interval=60)
+    return metrics
+
+
+def open_database(metrics):
+    """在后台线程中打开数据库（检查并迁移表结构），不阻塞窗口的首次绘制。"""
+    from database import DatabaseManager
+    return DatabaseManager(db_path, metrics=metrics)
+
+
+def run_gui():
+    import logging
+    from PyQt5.QtWidgets import QApplication
+    from instrumentation import configure_logging
+    from GUI import MainWindow
+
+    configure_logging()
+    logger = logging.getLogger("main")
     # 初始化应用
     app = QApplication(sys.argv)
-    database_manager = DatabaseManager(db_path)
-    reminder = Reminder(database_manager)
-    task_manager = TaskManager(reminder=reminder, database_manager=database_manager)
+    metrics = create_metrics()
+    database_managers = []
+    watchers = []
+    reminders = []
 
-    # 创建主窗口并传递任务管理器
-    main_window = MainWindow(task_manager)
+    # 先创建并显示主窗口，此时还没有打开数据库，按钮处于禁用状态
+    main_window = MainWindow()
 
-    reminder.notify_signal.connect(main_window.show_notification)
+    def on_database_ready(database_manager):
+        from changes import ChangeWatcher
+        from management import TaskManager
+        from notification import Reminder
+
+        database_managers.append(database_manager)
+        # 提醒线程启动后在后台完成第一次提醒加载
+        reminder = Reminder(database_manager)
+        reminder.notify_signal.connect(main_window.show_notification)
+        reminders.append(reminder)
+        task_manager = TaskManager(reminder=reminder, database_manager=database_manager)
+        main_window.set_task_manager(task_manager)
+        # 其他应用实例或命令行写入同一个数据库时，只刷新发生变化的任务
+        watcher = ChangeWatcher(database_manager, autostart=False)
+        watcher.add_listener(task_manager.apply_changes)
+        watcher.start()
+        watchers.append(watcher)
+        logger.info("Database ready %.0f ms after launch.", (time.perf_counter() - START_TIME) * 1000)
+
+    def on_database_failed(error):
+        logger.error("Failed to open database %s: %s", db_path, error, exc_info=error)
+        main_window.show_startup_error(error)
+
+    def on_first_paint():
+        logger.info("First paint %.0f ms after launch.", (time.perf_counter() - START_TIME) * 1000)
+        main_window.worker.submit(open_database, metrics, on_result=on_database_ready, on_error=on_database_failed)
+
+    main_window.first_painted.connect(on_first_paint)
 
     # 显示主窗口
     main_window.show()
 
-    # 启动应用的事件循环
-    sys.exit(app.exec_())
+    # 启动应用的事件循环，退出时关闭数据库连接
+    exit_code = app.exec_()
+    for watcher in watchers:
+        watcher.stop()
+    for reminder in reminders:
+        reminder.stop()  # 提醒线程可能仍在查询数据库，先停止它再关闭连接
+    for database_manager in database_managers:
+        database_manager.close()
+    if metrics is not None:
+        metrics.stop_periodic_dump()
+    return exit_code
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--headless" in argv:
+        # 无界面模式：交给命令行工具处理剩余参数，整个过程不导入 PyQt
+        import cli
+        return cli.main([arg for arg in argv if arg != "--headless"])
+    return run_gui()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,45 +1,249 @@
-from datetime import datetime
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
 from database import DatabaseManager
-from notification import Reminder
+from scheduler import ReminderScheduler
+import recurrence
 import task_config
 
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = task_config.PAGE_SIZE  # 分页查询时每页的任务数
+
+
+class QueryCache:
+    """按查询缓存任务列表的 LRU 缓存，任何写操作后整体失效。"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # 每次失效加一，防止失效前开始的查询把旧结果写回缓存
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, load):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+        value = load()  # 查询数据库时不持有缓存锁
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *args):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "size": len(self._entries), "hit_rate": self.hits / total if total else 0.0}
+
 
 class TaskManager:
-    def __init__(self, reminder: Reminder, database_manager:DatabaseManager):
+    def __init__(self, reminder: ReminderScheduler, database_manager:DatabaseManager, cache_size: int = 32):
         self.reminder = reminder
         self.database_manager = database_manager
+        # 查询结果缓存：增删改后失效，过期检查把任务标记为 Overdue 时也会失效
+        self.cache = QueryCache(cache_size)
+        self.database_manager.add_overdue_listener(self.cache.invalidate)
+        self._change_listeners = []  # apply_changes 处理完后调用的回调（如打开的任务列表），参数为 changes.Changes
+
+    def add_change_listener(self, callback):
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def apply_changes(self, changes):
+        """changes.ChangeWatcher 的回调：数据库被其他进程（或其他 DatabaseManager）修改后，只刷新受影响的部分。
+        本对象自己的写入不会回调到这里，它们在写入时已经更新了缓存、水位线和提醒。
+
+        查询缓存整体失效（之后按需重新查询）；提醒堆只重新读取变化的任务的提醒，变化太多时才完整重建；
+        其他进程写入的任务可能比水位线更早过期，过期检查的水位线也随之失效。
+        """
+        self.cache.invalidate()
+        self.database_manager.invalidate_overdue_watermark()
+        if changes.task_ids is None:
+            self.reminder.update()
+        else:
+            self.reminder.on_changed(changes.task_ids)
+        for listener in list(self._change_listeners):
+            try:
+                listener(changes)
+            except Exception:
+                # 一个回调出错（例如所属窗口已经关闭）不影响其他回调
+                logger.exception("Error in change listener %r.", listener)
+
+    def cache_stats(self):
+        """返回查询缓存的命中、未命中、失效次数等统计。"""
+        return self.cache.stats()
+
+    def _cached_query(self, key, **filter_args):
+        # 先做一次过期检查（水位线未到时为空操作），有任务过期时会通过回调清空缓存
+        self.database_manager._check_overdue_tasks()
+        tasks = self.cache.get_or_load(key, lambda: self.database_manager.filter_data(**filter_args))
+        return list(tasks)  # 返回副本，调用方（如 TaskListWindow）会直接修改列表
 
     def add_task(self, task):
-        self.database_manager.write_data(task)
+        task_id = self.database_manager.write_data(task)
+        self.cache.invalidate()
+        # 增量维护提醒列表：只把新任务（读回以获得 id）加入提醒堆，而不是重新加载全部待办任务
+        self.reminder.on_added(self.database_manager.read_data(task_id))
+
+    def add_tasks(self, tasks):
+        """批量添加任务：所有任务在一个事务中写入，提醒列表只在最后刷新一次。返回添加的任务数。"""
+        count = self.database_manager.write_many(tasks)
+        self.cache.invalidate()
         self.reminder.update()
+        return count
 
     def delete_task(self, task):
         self.database_manager.delete_data(task.id)
-        self.reminder.update()
+        self.cache.invalidate()
+        self.reminder.on_removed(task.id)
 
     def update_task(self, task):
         self.database_manager.update_data(task)
+        self.cache.invalidate()
+        self.reminder.on_updated(task)
+
+    def complete_task(self, task):
+        """勾选完成。重复任务只完成本次发生，推进到下一次并返回新的发生；序列已结束或非重复任务标记为已完成，返回 None"""
+        following = None
+        if task.recurrence:
+            following = recurrence.next_occurrence(task.deadline, task.recurrence, task.recurrence_until)
+        if following is None:
+            task.state = task_config.STATE_FINISHED
+            self.update_task(task)
+            return None
+        next_task = recurrence.occurrence(task, following)
+        self.update_task(next_task)
+        return next_task
+
+    def reminder_offsets(self, task):
+        """任务的全部提醒提前量（timedelta），供编辑界面显示；修改后赋给 task.reminder_offsets 再保存"""
+        return self.database_manager.reminder_offsets(task.id)
+
+    def update_tasks(self, tasks):
+        """批量更新任务：所有任务在一个事务中更新，提醒列表只在最后刷新一次。返回更新的任务数。"""
+        count = self.database_manager.update_many(tasks)
+        self.cache.invalidate()
         self.reminder.update()
+        return count
 
-    def get_today_tasks(self):
-        """获取当日任务"""
-        today = datetime.now().date()
-        today_str = today.strftime("%Y-%m-%d")  # 转换为字符串，格式为 'YYYY-MM-DD'
+    @staticmethod
+    def today_criteria():
+        """今日待办任务的筛选条件"""
+        # 用 [今天 0 点, 明天 0 点) 的范围查询代替 DATE(deadline) = ?，使查询可以走 (state, deadline) 索引
+        start = datetime.combine(datetime.now().date(), time.min)
+        end = start + timedelta(days=1)
+        return {"state": task_config.STATE_PENDING, "deadline >=": start, "deadline <": end}
 
-        # 通过数据库直接筛选出今天截止的任务
-        return self.database_manager.filter_data(
-            criteria={"state": task_config.STATE_PENDING, "DATE(deadline)": today_str},
+    @staticmethod
+    def all_criteria():
+        """全部待办任务的筛选条件"""
+        return {"state": task_config.STATE_PENDING}
+
+    @staticmethod
+    def type_criteria(task_type: str):
+        """某一类型待办任务的筛选条件"""
+        return {"state": task_config.STATE_PENDING, "type": task_type}
+
+    def get_today_tasks(self):
+        """获取当日任务。重复任务的行中保存的就是下一次发生时间，且每天最多发生一次，因此无需展开"""
+        criteria = self.today_criteria()
+        # 通过数据库直接筛选出今天截止的任务；缓存键包含日期，跨天后自然不再命中
+        return self._cached_query(
+            ("today", criteria["deadline >="]),
+            criteria=criteria,
             sort_by="deadline",
             order='ASC'
         )
 
     def get_all_tasks(self):
-        return self.database_manager.filter_data(criteria={"state": task_config.STATE_PENDING}, sort_by='deadline',
-                                                 order='ASC')
+        return self._cached_query(("all",), criteria=self.all_criteria(), sort_by='deadline', order='ASC')
 
     def get_tasks_by_type(self, task_type: str):
-        return self.database_manager.filter_data(criteria={"state": task_config.STATE_PENDING, "type": task_type},
-                                                 sort_by='deadline', order='ASC')
+        return self._cached_query(("type", task_type), criteria=self.type_criteria(task_type),
+                                  sort_by='deadline', order='ASC')
+
+    def stats(self, group_by=("state",), criteria=None):
+        """任务数统计，读取由触发器维护的 task_counts 汇总表，代价与任务总数无关。
+
+        group_by、criteria 的取值见 DatabaseManager.count_tasks，例如 stats(("type",), {"state": "Pending"})
+        返回各类型待办任务数，stats(("day",), {"day >=": start, "day <": end}) 返回日历视图所需的每日任务数。
+        """
+        self.database_manager._check_overdue_tasks()
+        key = ("stats", tuple(group_by), tuple(sorted((criteria or {}).items())))
+        counts = self.cache.get_or_load(key, lambda: self.database_manager.count_tasks(group_by, criteria))
+        return dict(counts) if isinstance(counts, dict) else counts  # group_by 为空时为总数
+
+    def pending_counts_by_type(self):
+        """各类型待办任务数，供分类按钮显示角标"""
+        return self.stats(("type",), {"state": task_config.STATE_PENDING})
+
+    def search_tasks(self, query: str, criteria=None, limit=PAGE_SIZE):
+        """按标题和描述搜索任务，按相关度排序。边输入边搜索时同一个查询常会重复出现（如删除字符），结果同样走缓存"""
+        self.database_manager._check_overdue_tasks()
+        key = ("search", query.strip(), tuple(sorted((criteria or {}).items())), limit)
+        return list(self.cache.get_or_load(key, lambda: self.database_manager.search(query, criteria, limit)))
+
+    def iter_tasks_in_range(self, start: datetime, end: datetime, criteria=None):
+        """按截止时间顺序惰性返回 [start, end) 内的待办任务，重复任务的每次发生各返回一个副本（id 相同）。
+
+        普通任务按 (state, deadline) 索引流式读取；重复任务只读取规则本身（通常很少），
+        在合并时逐个计算发生时间，不会生成整个序列，end 很远时代价也只与实际取出的任务数有关。
+        """
+        criteria = dict(criteria or {}, state=task_config.STATE_PENDING)
+        single = self.database_manager.iter_tasks(
+            dict(criteria, recurrence=None, **{"deadline >=": start, "deadline <": end}), sort_by="deadline")
+        series = self.database_manager.filter_data(dict(criteria, **{"recurrence !=": None, "deadline <": end}))
+        return heapq.merge(single, *(recurrence.expand(task, start, end) for task in series),
+                           key=lambda task: task.deadline)
+
+    def get_tasks_page(self, criteria, after=None, limit=PAGE_SIZE):
+        """按截止时间分页获取任务，返回 (本页任务, 下一页游标)。
+
+        游标为本页最后一个任务的 (deadline, id)，传给下一次调用的 after；没有更多任务时游标为 None。
+        """
+        self.database_manager._check_overdue_tasks()
+        key = ("page", tuple(sorted(criteria.items())), after, limit)
+        tasks = self.cache.get_or_load(key, lambda: self.database_manager.filter_page(
+            criteria, sort_by="deadline", order="ASC", after=after, limit=limit))
+        next_cursor = (tasks[-1].deadline, tasks[-1].id) if len(tasks) == limit else None
+        return list(tasks), next_cursor
 
+    def get_tasks_by_ids(self, task_ids, criteria=None):
+        """读取 task_ids 中仍符合 criteria 的任务（不经过缓存），供任务列表只刷新发生变化的行"""
+        return self.database_manager.filter_data(dict(criteria or {}, **{"id in": sorted(task_ids)}),
+                                                 sort_by="deadline")
 
+    def iter_tasks_paged(self, criteria, page_size=PAGE_SIZE):
+        """逐页惰性获取任务的生成器，每取完一页才查询下一页，供任务列表按需加载"""
+        after = None
+        while True:
+            tasks, after = self.get_tasks_page(criteria, after, page_size)
+            yield from tasks
+            if after is None:
+                return
 
+    def iter_tasks(self, criteria=None, sort_by="deadline", order="ASC", batch_size=1000):
+        """流式遍历任务，不经过缓存，内存占用恒定，供导出和批处理使用"""
+        return self.database_manager.iter_tasks(criteria, sort_by=sort_by, order=order, batch_size=batch_size)
@@ -0,0 +1,327 @@
+"""数据库结构迁移。
+
+数据库当前的结构版本记录在 PRAGMA user_version 中，MIGRATIONS 按版本号顺序列出每一步需要执行的语句。
+打开数据库时 migrate() 会依次执行所有高于当前版本的迁移，每一步在单独的事务中完成并更新 user_version。
+新增结构变更时只需在 MIGRATIONS 末尾追加一项，不要修改已经发布的迁移。
+每一步的语句可以是 SQL 字符串，也可以是接收连接的函数（用于需要判断 SQLite 功能是否可用的迁移）。
+"""
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def create_search_index(conn: sqlite3.Connection):
+    """建立 tasks 的 FTS5 全文索引（外部内容表，不重复存储正文），并用触发器与 tasks 保持同步。
+
+    优先使用 trigram 分词器：按三字切分，中文等不以空格分词的文字也能按子串搜索；
+    SQLite 低于 3.34 时退回 unicode61。SQLite 未编译 FTS5 时跳过，搜索退化为 LIKE 扫描。
+    """
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+                         f"title, description, content='tasks', content_rowid='id', tokenize='{tokenizer}')")
+            break
+        except sqlite3.OperationalError as e:
+            error = e
+    else:
+        logger.warning("FTS5 is not available (%s); task search will fall back to LIKE scans.", error)
+        return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''')
+    # update_data 每次都会写 title、description 列，只有内容真的变化时才更新索引
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    # 为已有的任务建立索引
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+# 截止日期（本地日期，YYYY-MM-DD），同时适用于字符串和整数时间戳两种存储格式
+TASK_DAY_SQL = ("CASE typeof({0}) WHEN 'integer' THEN date({0}, 'unixepoch', 'localtime') "
+                "ELSE date({0}) END")
+
+
+COUNT_COLUMNS = ("state", "type", "priority", "day")
+
+
+def _count_values(row: str):
+    """task_counts 的四个键列在触发器中的取值；NULL 统一记为空字符串，以便作为主键"""
+    return [f"ifnull({row}.state, '')", f"ifnull({row}.type, '')", f"ifnull({row}.priority, '')",
+            f"ifnull({TASK_DAY_SQL.format(row + '.deadline')}, '')"]
+
+
+def _count_key(row: str):
+    return ", ".join(_count_values(row))
+
+
+def _count_match(row: str):
+    return " AND ".join(f"{column} = {value}" for column, value in zip(COUNT_COLUMNS, _count_values(row)))
+
+
+def create_task_counts(conn: sqlite3.Connection):
+    """按 (state, type, priority, 截止日期) 统计任务数的汇总表，由 tasks 上的触发器增量维护。
+
+    分类角标、日历视图等只需读取汇总表，代价与分组数（最多为天数）有关，与任务总数无关。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS task_counts (
+            state TEXT NOT NULL,
+            type TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            day TEXT NOT NULL,  -- 截止日期 YYYY-MM-DD（本地时间）
+            count INTEGER NOT NULL,
+            PRIMARY KEY (state, type, priority, day)
+        ) WITHOUT ROWID
+    ''')
+    # 日历视图按日期范围查询
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_task_counts_day ON task_counts (day)")
+    increment = (f"INSERT INTO task_counts (state, type, priority, day, count) VALUES ({_count_key('new')}, 1) "
+                 "ON CONFLICT (state, type, priority, day) DO UPDATE SET count = count + 1;")
+    decrement = (f"UPDATE task_counts SET count = count - 1 WHERE {_count_match('old')}; "
+                 f"DELETE FROM task_counts WHERE {_count_match('old')} AND count <= 0;")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS task_counts_insert AFTER INSERT ON tasks BEGIN {increment} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS task_counts_delete AFTER DELETE ON tasks BEGIN {decrement} END")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS task_counts_update AFTER UPDATE OF state, type, priority, deadline ON tasks
+        WHEN old.state IS NOT new.state OR old.type IS NOT new.type OR old.priority IS NOT new.priority
+            OR old.deadline IS NOT new.deadline
+        BEGIN {decrement} {increment} END
+    ''')
+    # 统计已有的任务
+    conn.execute("DELETE FROM task_counts")
+    conn.execute(f"INSERT INTO task_counts (state, type, priority, day, count) "
+                 f"SELECT {_count_key('tasks')}, COUNT(*) FROM tasks GROUP BY 1, 2, 3, 4")
+
+
+# 截止时间减去 offset_seconds 秒得到的提醒时间，结果与截止时间的存储格式（字符串或整数时间戳）相同
+REMINDER_FIRE_AT_SQL = ("CASE typeof({0}) WHEN 'integer' THEN {0} - {1} "
+                        "ELSE datetime({0}, printf('-%d seconds', {1})) END")
+
+# 提醒时间比截止时间提前的秒数
+REMINDER_OFFSET_SQL = ("CASE typeof({0}) WHEN 'integer' THEN {0} - {1} "
+                       "ELSE CAST(round((julianday({0}) - julianday({1})) * 86400) AS INTEGER) END")
+
+
+def create_reminders(conn: sqlite3.Connection):
+    """每个任务可以有多个提醒的 reminders 表，每行为一个提前量及由此算出的提醒时间。
+
+    提醒线程按 (fire_at) 索引只读取即将到来的一段时间内的提醒，代价与近期的提醒数有关，与待办任务总数无关。
+    新增任务时由触发器按 nextTime 建立一个默认提醒（自定义提前量由 DatabaseManager 随后替换），
+    截止时间改变时触发器按提前量重新计算提醒时间，删除任务时一并删除其提醒。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            offset_seconds INTEGER NOT NULL,  -- 提醒时间比截止时间提前的秒数
+            fire_at,  -- 不声明类型，与 tasks 的时间列相同，存储为字符串或整数时间戳
+            UNIQUE (task_id, offset_seconds)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reminders_fire_at ON reminders (fire_at)")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS reminders_task_insert AFTER INSERT ON tasks
+        WHEN new.nextTime IS NOT NULL BEGIN
+            INSERT INTO reminders (task_id, offset_seconds, fire_at)
+            VALUES (new.id, {REMINDER_OFFSET_SQL.format('new.deadline', 'new.nextTime')}, new.nextTime);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS reminders_task_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM reminders WHERE task_id = old.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS reminders_task_deadline AFTER UPDATE OF deadline ON tasks
+        WHEN old.deadline IS NOT new.deadline BEGIN
+            UPDATE reminders SET fire_at = {REMINDER_FIRE_AT_SQL.format('new.deadline', 'offset_seconds')}
+            WHERE task_id = new.id;
+        END
+    ''')
+    # 已有的任务各建立一个与 nextTime 相同的提醒
+    conn.execute(f"INSERT OR IGNORE INTO reminders (task_id, offset_seconds, fire_at) "
+                 f"SELECT id, {REMINDER_OFFSET_SQL.format('deadline', 'nextTime')}, nextTime FROM tasks "
+                 f"WHERE nextTime IS NOT NULL")
+
+
+# change_log 保留的最近变更条数；落后更多的进程改为完整刷新
+CHANGE_LOG_SIZE = 10000
+
+
+def create_change_log(conn: sqlite3.Connection):
+    """记录任务变更的 change_log 表，供多个进程（或同一进程的多个连接）发现彼此的写入。
+
+    tasks 上的每次插入、修改、删除都由触发器追加一行，version 单调递增（AUTOINCREMENT 保证不复用）。
+    各进程记住自己看到的最大 version，只读取之后的变更；表只保留最近 CHANGE_LOG_SIZE 条左右，
+    每 1000 条清理一次，清理的代价分摊到写入中。
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL
+        )
+    ''')
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS change_log_task_{event.lower()} AFTER {event} ON tasks BEGIN "
+                     f"INSERT INTO change_log (task_id) VALUES ({row}.id); END")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_log_prune AFTER INSERT ON change_log
+        WHEN new.version % 1000 = 0 BEGIN
+            DELETE FROM change_log WHERE version <= new.version - {CHANGE_LOG_SIZE:d};
+        END
+    ''')
+
+
+MIGRATIONS = [
+    (1, "create tasks table", [
+        '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            description TEXT,
+            deadline TEXT,  -- 存储为字符串格式
+            priority TEXT,
+            type TEXT,
+            state TEXT,
+            nextTime TEXT  -- 存储为字符串格式
+        )
+        ''',
+    ]),
+    (2, "secondary indexes for state/type/deadline/nextTime queries", [
+        # 今日任务、全部任务：state = ? AND deadline 范围，ORDER BY deadline
+        "CREATE INDEX IF NOT EXISTS idx_tasks_state_deadline ON tasks (state, deadline)",
+        # 分类查看：state = ? AND type = ?，ORDER BY deadline
+        "CREATE INDEX IF NOT EXISTS idx_tasks_state_type_deadline ON tasks (state, type, deadline)",
+        # 提醒：state = ?，ORDER BY nextTime
+        "CREATE INDEX IF NOT EXISTS idx_tasks_state_next_time ON tasks (state, nextTime)",
+    ]),
+    (3, "full-text search index on title/description", [create_search_index]),
+    (4, "task_counts aggregate table maintained by triggers", [create_task_counts]),
+    (5, "recurrence rule columns", [
+        # 重复规则，如 "daily"、"weekly"、"every 3 days"；NULL 表示不重复
+        "ALTER TABLE tasks ADD COLUMN recurrence TEXT",
+        # 最后一次发生的日期 "YYYY-MM-DD"，与时间列的存储格式无关；NULL 表示不结束
+        "ALTER TABLE tasks ADD COLUMN recurrence_until TEXT",
+    ]),
+    (6, "reminders table with multiple offsets per task", [create_reminders]),
+    (7, "change_log table for cross-process change detection", [create_change_log]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> list:
+    """将数据库迁移到最新版本，返回本次执行的迁移版本号列表。"""
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if get_version(conn) >= version:
+            continue
+        # BEGIN IMMEDIATE 取得写锁后再确认一次版本，防止多个进程同时迁移
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version:d}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append(version)
+        logger.info("Applied schema migration %d: %s.", version, description)
+    return applied
+
+
+# 以整数 Unix 时间戳存储时需要转换的时间列
+TIME_COLUMNS = ("deadline", "nextTime")
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    """数据库中是否建立了 FTS5 全文索引。"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone() is not None
+
+
+def search_tokenizer(conn: sqlite3.Connection):
+    """全文索引使用的分词器名称，没有索引时为 None。"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'").fetchone()
+    if row is None:
+        return None
+    return "trigram" if "trigram" in row[0] else "unicode61"
+
+
+def uses_epoch_time(conn: sqlite3.Connection) -> bool:
+    """tasks 表的时间列是否已经以 INTEGER（Unix 秒）存储。"""
+    types = {row[1]: row[2].upper() for row in conn.execute("PRAGMA table_info(tasks)")}
+    return types.get("deadline") == "INTEGER"
+
+
+def convert_to_epoch_time(conn: sqlite3.Connection):
+    """把 tasks 表的时间列从 "%Y-%m-%d %H:%M:%S" 字符串（本地时间）就地转换为 INTEGER Unix 秒。
+
+    SQLite 不能修改列类型，TEXT 亲和性的列也会把整数重新存成字符串，因此需要重建表：
+    按原表结构新建一张时间列为 INTEGER 的表，转换并复制数据（保留 id），替换原表后重建原表上的索引和触发器。
+    reminders 表的提醒时间随之转换为时间戳。
+    整个过程在一个事务中完成，失败时数据库保持原样。
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if uses_epoch_time(conn):
+            conn.rollback()
+            return
+        columns = conn.execute("PRAGMA table_info(tasks)").fetchall()
+        # 原表上的索引、触发器会随表一起删除，先记录下来
+        objects = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = 'tasks' AND type IN ('index', 'trigger') "
+            "AND sql IS NOT NULL")]
+
+        definitions = []
+        selects = []
+        for _, name, column_type, _, default, pk in columns:
+            if pk:
+                definitions.append(f"{name} INTEGER PRIMARY KEY AUTOINCREMENT")
+            elif name in TIME_COLUMNS:
+                definitions.append(f"{name} INTEGER")
+            else:
+                definitions.append(f"{name} {column_type}" + (f" DEFAULT {default}" if default is not None else ""))
+            # 'utc' 修饰符把本地时间换算为 UTC，strftime('%s') 得到 Unix 秒；NULL 保持为 NULL
+            selects.append(f"CAST(strftime('%s', {name}, 'utc') AS INTEGER)" if name in TIME_COLUMNS else name)
+
+        conn.execute(f"CREATE TABLE tasks_epoch ({', '.join(definitions)})")
+        conn.execute(f"INSERT INTO tasks_epoch ({', '.join(c[1] for c in columns)}) "
+                     f"SELECT {', '.join(selects)} FROM tasks")
+        conn.execute("DROP TABLE tasks")
+        conn.execute("ALTER TABLE tasks_epoch RENAME TO tasks")
+        for statement in objects:
+            conn.execute(statement)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reminders'").fetchone():
+            # 提醒时间与截止时间使用相同的存储格式
+            conn.execute("UPDATE reminders SET fire_at = CAST(strftime('%s', fire_at, 'utc') AS INTEGER)")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    logger.info("Converted deadline and nextTime columns to INTEGER Unix timestamps.")
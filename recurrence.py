@@ -0,0 +1,98 @@
+"""重复任务的规则与展开。
+
+重复任务在数据库中只保存一行：deadline / nextTime 为下一次（尚未过去的）发生时间，recurrence 为规则，
+recurrence_until 为最后一次发生的日期（含当天，为空表示不结束）。过期检查会把已经过去的发生时间推进到下一次，
+而不是把任务标记为过期；日期范围视图和提醒只在需要时逐个计算后续的发生时间，从不生成整个序列。
+
+规则字符串："daily"（每天）、"weekly"（每周）或 "every N days"（每 N 天）。
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import task_config
+
+DAILY = "daily"
+WEEKLY = "weekly"
+
+_EVERY_DAYS = re.compile(r"every (\d+) days?")
+
+
+def interval(rule: str) -> timedelta:
+    """规则对应的间隔；规则无效时抛出 ValueError。"""
+    if rule == DAILY:
+        return timedelta(days=1)
+    if rule == WEEKLY:
+        return timedelta(weeks=1)
+    match = _EVERY_DAYS.fullmatch(rule or "")
+    if match and int(match.group(1)) > 0:
+        return timedelta(days=int(match.group(1)))
+    raise ValueError(f"Invalid recurrence rule: {rule!r}")
+
+
+def every(days: int) -> str:
+    """每 days 天重复一次的规则字符串，1 天和 7 天分别规范为 daily、weekly。"""
+    if days == 1:
+        return DAILY
+    if days == 7:
+        return WEEKLY
+    return f"every {days:d} days"
+
+
+def describe(rule: str) -> str:
+    """界面中显示的规则说明"""
+    days = interval(rule).days
+    return {1: "每天", 7: "每周"}.get(days, f"每 {days} 天")
+
+
+def parse_until(value):
+    """recurrence_until 以 "YYYY-MM-DD" 字符串存储，与时间列的存储格式无关。"""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def next_occurrence(deadline: datetime, rule: str, until: date = None, after: datetime = None):
+    """deadline 所在序列中第一个晚于 after（默认 deadline 本身）的发生时间，超过 until 时返回 None。
+
+    直接按间隔计算跳过的次数，与中间错过了多少次无关。
+    """
+    step = interval(rule)
+    after = deadline if after is None else after
+    if deadline > after:
+        candidate = deadline
+    else:
+        skipped = (after - deadline) // step + 1
+        candidate = deadline + skipped * step
+    if until is not None and candidate.date() > until:
+        return None
+    return candidate
+
+
+def occurrences(deadline: datetime, rule: str, until: date = None, start: datetime = None, end: datetime = None):
+    """惰性生成 [start, end) 内的发生时间（从 deadline 开始），end 为 None 时不限结束（直到 until）。"""
+    step = interval(rule)
+    current = deadline
+    if start is not None and current < start:
+        current = deadline + -((deadline - start) // step) * step  # 第一个不早于 start 的发生时间
+    while (end is None or current < end) and (until is None or current.date() <= until):
+        yield current
+        current += step
+
+
+def occurrence(task, deadline: datetime):
+    """任务在 deadline 这一次发生时的副本：id 与规则不变，提醒时间与截止时间的间隔保持不变。"""
+    return task_config.Task(title=task.title, description=task.description, deadline=deadline,
+                            priority=task.priority, task_type=task.type, state=task.state,
+                            next_time=deadline - (task.deadline - task.next_time), id=task.id,
+                            recurrence=task.recurrence, recurrence_until=task.recurrence_until,
+                            reminder_offsets=task.reminder_offsets)
+
+
+def expand(task, start: datetime, end: datetime):
+    """非重复任务在范围内时原样返回；重复任务逐个返回 [start, end) 内每次发生的副本。"""
+    if not task.recurrence:
+        if start <= task.deadline < end:
+            yield task
+        return
+    for deadline in occurrences(task.deadline, task.recurrence, task.recurrence_until, start, end):
+        yield task if deadline == task.deadline else occurrence(task, deadline)
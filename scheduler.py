@@ -0,0 +1,265 @@
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+import recurrence
+import task_config
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """任务提醒调度器，不依赖 Qt。
+
+    到达提醒时间时依次调用通过 add_listener 注册的回调（在调度线程中调用，回调应尽快返回），
+    GUI 使用的 notification.Reminder 在此基础上把提醒转换为 Qt 信号。
+
+    一个任务可以有多个提醒（reminders 表）。调度器只从数据库加载 [当前时间 - lookahead, 当前时间 + lookahead)
+    内的提醒，并在每次对账时向前滑动窗口，因此内存和加载代价与近期的提醒数有关，与待办任务总数无关；
+    窗口开头的一段用于补发应用未运行时错过、而任务仍未到期的提醒。
+    """
+
+    def __init__(self, database_manager, autostart: bool = True):
+        """
+        :param autostart: 是否立即启动提醒线程；为 False 时需在注册好回调后调用 start()
+        """
+        self.database = database_manager
+        self.metrics = database_manager.metrics  # 与数据库共用同一个统计对象，为 None 时不统计
+        self._listeners = []
+        self.reminders = []  # 按提醒时间排序的小顶堆，元素为 (提醒时间, 序号, task)
+        # task.id -> 该任务当前有效的堆元素序号集合；堆中序号不在集合内的元素已被更新或删除，弹出时直接丢弃
+        self._entries = {}
+        self.reminders_lock = threading.Lock()
+        # 提醒线程在该条件变量上睡眠，直到最早的提醒时间到达或提醒列表发生变化
+        self._changed = threading.Condition(self.reminders_lock)
+        self._sequence = itertools.count()  # 提醒时间相同时保证堆元素可比较
+        # 提醒堆每次增量修改（入堆或使某个任务的提醒失效）时加一；update 据此发现查询期间发生的修改
+        self._generation = 0
+        self._fired = set()  # 已经发送过的提醒 (task.id, 提醒时间)，保证每个提醒只发送一次
+        self.check_interval = 60  # 最长睡眠时间（秒），用于应对系统时间调整、休眠唤醒等情况
+        self.reconcile_interval = 600  # 每隔多少秒从数据库重新加载一次提醒窗口，修正增量维护可能产生的偏差
+        self.retry_interval = 5  # 加载提醒出错（如数据库被其他进程锁住）后，等待多少秒再试
+        # 提醒窗口的长度，需大于 reconcile_interval，保证每个提醒在到期前已经被加载
+        self.lookahead = timedelta(hours=1)
+        self._horizon = None  # 已加载窗口的结束时间，None 表示尚未加载
+        self._last_reconcile = None  # 线程启动后立即做一次完整加载
+        self._running = True
+        self._check_thread = threading.Thread(target=self._run_check, daemon=True)
+        if autostart:
+            self._check_thread.start()
+
+    UPDATE_ATTEMPTS = 3
+
+    @timed
+    def update(self):
+        """从数据库中加载提醒窗口内的提醒，重建提醒堆。
+
+        查询在锁外进行。查询期间其他线程通过 on_added 等增量修改了提醒堆时，整体替换会丢掉这些修改，
+        因此重新查询（最多 UPDATE_ATTEMPTS 次）；仍然冲突时先替换，并让提醒线程在下一轮重新加载。
+        """
+        for attempt in range(1, self.UPDATE_ATTEMPTS + 1):
+            with self._changed:
+                generation = self._generation
+            current_time = datetime.now()
+            horizon = current_time + self.lookahead
+            # 查询结果按提醒时间排序
+            new_reminders = self.database.upcoming_reminders(current_time - self.lookahead, horizon)
+            with self._changed:
+                if self._generation == generation or attempt == self.UPDATE_ATTEMPTS:
+                    self._replace(new_reminders, current_time, horizon, stale=self._generation != generation)
+                    break
+            logger.debug("Reminders changed while reloading, retrying (attempt %d).", attempt)
+        logger.debug("Updated reminders: %d reminder(s) of %d task(s) within the window.",
+                     len(self.reminders), len(self._entries))
+
+    def _replace(self, new_reminders, current_time, horizon, stale=False):
+        """用查询结果替换提醒堆。调用方需持有 reminders_lock。"""
+        keys = {self._key(task, fire_at) for fire_at, task in new_reminders}
+        # 查询结果已按提醒时间排序，本身就满足堆的性质，无需再 heapify
+        self.reminders = []
+        rescheduled = False
+        for fire_at, task in new_reminders:
+            if self._key(task, fire_at) in self._fired:
+                # 已提醒过的重复任务在过期检查推进它之前，改为等待下一次发生的同一个提醒
+                following = self._following_occurrence(task, fire_at, current_time) if task.recurrence else None
+                if following is None or following[0] >= horizon:
+                    continue
+                fire_at, task = following
+                rescheduled = True
+            self.reminders.append((fire_at, next(self._sequence), task))
+        if rescheduled:
+            heapq.heapify(self.reminders)
+        self._entries = {}
+        for _, sequence, task in self.reminders:
+            self._entries.setdefault(task.id, set()).add(sequence)
+        self._fired &= keys  # 只保留仍在窗口内的提醒，避免集合无限增长
+        self._horizon = horizon
+        # 查询结果可能已经过时（查询期间有增量修改）时，提醒线程下一轮重新加载
+        self._last_reconcile = None if stale else time.monotonic()
+        self._changed.notify()
+
+    def add_listener(self, callback):
+        """注册提醒回调，参数为到期的任务"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _task_reminders(self, task):
+        """从数据库读取任务在当前窗口内的提醒；窗口尚未加载时返回空列表，由第一次完整加载负责"""
+        horizon = self._horizon
+        if horizon is None or task.state != task_config.STATE_PENDING:
+            return []
+        return self.database.upcoming_reminders(datetime.now() - self.lookahead, horizon, task_ids=[task.id])
+
+    def on_added(self, task):
+        """新增任务后调用，只把该任务在窗口内的提醒加入提醒堆，代价为 O(k log n)，k 为该任务的提醒数"""
+        reminders = self._task_reminders(task)
+        with self._changed:
+            for fire_at, reminder_task in reminders:
+                self._push(fire_at, reminder_task)
+
+    def on_updated(self, task):
+        """任务被修改后调用：旧的提醒全部失效，若任务仍为待办则按新的提醒时间重新入堆"""
+        reminders = self._task_reminders(task)
+        with self._changed:
+            self._entries.pop(task.id, None)
+            self._generation += 1
+            for fire_at, reminder_task in reminders:
+                self._push(fire_at, reminder_task)
+            self._compact()
+
+    def on_changed(self, task_ids):
+        """其他进程修改了这些任务（见 changes.ChangeWatcher）：一次查询重新读取它们在窗口内的提醒，替换旧的提醒。
+        已删除、已完成的任务查询不到提醒，其旧提醒随之失效"""
+        horizon = self._horizon
+        if horizon is None or not task_ids:
+            return
+        reminders = self.database.upcoming_reminders(datetime.now() - self.lookahead, horizon, task_ids=task_ids)
+        with self._changed:
+            for task_id in task_ids:
+                self._entries.pop(task_id, None)
+            self._generation += 1
+            for fire_at, task in reminders:
+                self._push(fire_at, task)
+            self._compact()
+
+    def on_removed(self, task_id):
+        """任务被删除后调用，对应的提醒失效"""
+        with self._changed:
+            self._entries.pop(task_id, None)
+            self._generation += 1
+            self._compact()
+
+    @staticmethod
+    def _key(task, fire_at):
+        """提醒的唯一标识。数据库中的时间只精确到秒，因此忽略微秒，使内存中的提醒与重新加载的提醒一致"""
+        return task.id, fire_at.replace(microsecond=0)
+
+    def _push(self, fire_at, task):
+        """将任务的一个提醒加入提醒堆并唤醒提醒线程。调用方需持有 reminders_lock。"""
+        if task.state != task_config.STATE_PENDING or self._key(task, fire_at) in self._fired:
+            return
+        sequence = next(self._sequence)
+        self._generation += 1
+        self._entries.setdefault(task.id, set()).add(sequence)
+        heapq.heappush(self.reminders, (fire_at, sequence, task))
+        # 只有新提醒比原来的堆顶更早时，才需要唤醒线程重新计算睡眠时间
+        if self.reminders[0][1] == sequence:
+            self._changed.notify()
+
+    def _compact(self):
+        """失效元素超过一半时重建堆，避免频繁修改导致堆无限增长。调用方需持有 reminders_lock。"""
+        valid = sum(len(sequences) for sequences in self._entries.values())
+        if len(self.reminders) > 2 * valid + 64:
+            self.reminders = [entry for entry in self.reminders if entry[1] in self._entries.get(entry[2].id, ())]
+            heapq.heapify(self.reminders)
+
+    def start(self):
+        """启动提醒功能，定时检查任务的提醒时间"""
+        self._running = True
+        if not self._check_thread.is_alive():
+            self._check_thread = threading.Thread(target=self._run_check, daemon=True)
+            self._check_thread.start()
+
+    def stop(self):
+        """停止提醒功能"""
+        with self._changed:
+            self._running = False
+            self._changed.notify()
+        if hasattr(self, '_check_thread') and self._check_thread.is_alive():  # autostart=False 时线程可能从未启动
+            self._check_thread.join()
+
+    def _run_check(self):
+        """后台线程的主循环：定期对账，发送到期的提醒，然后睡眠到下一个提醒时间或提醒列表变化为止"""
+        while self._running:
+            failed = False
+            try:
+                if self._last_reconcile is None or time.monotonic() - self._last_reconcile >= self.reconcile_interval:
+                    self.update()
+                self.check_time()
+            except sqlite3.Error as e:
+                # 其他进程长时间持有写锁等情况，稍后再试；线程退出会让之后的提醒全部丢失
+                failed = True
+                logger.warning("Reminder check failed: %s", e)
+            except Exception:
+                failed = True
+                logger.exception("Error checking reminders.")
+            with self._changed:
+                if not self._running:
+                    break
+                if failed:
+                    self._changed.wait(min(self._seconds_until_next(), self.retry_interval))
+                elif self._last_reconcile is not None:  # 为 None 时需要立即重新加载
+                    self._changed.wait(self._seconds_until_next())
+
+    @staticmethod
+    def _following_occurrence(task, fire_at, current_time):
+        """重复任务的某个提醒发送之后，下一次发生的同一个提醒 (提醒时间, 任务)，提醒时间已经错过的发生直接跳过；
+        序列结束时返回 None。提醒堆中始终只保存每个重复任务的下一次发生，不展开整个序列。"""
+        lead = task.deadline - fire_at
+        following = recurrence.next_occurrence(task.deadline, task.recurrence, task.recurrence_until,
+                                               after=max(task.deadline, current_time + lead))
+        return (following - lead, recurrence.occurrence(task, following)) if following is not None else None
+
+    def _seconds_until_next(self):
+        """距离最早一个提醒的秒数，最长为 check_interval。调用方需持有 reminders_lock。"""
+        if not self.reminders:
+            return self.check_interval
+        delay = (self.reminders[0][0] - datetime.now()).total_seconds()
+        return min(max(delay, 0), self.check_interval)
+
+    @timed
+    def check_time(self):
+        """检查当前时间是否有任务需要提醒。如果满足提醒条件则触发提醒。"""
+        current_time = datetime.now()
+        due = {}  # 同一个任务的多个提醒同时到期时（如休眠唤醒后）只提醒一次
+        with self._changed:
+            # 只弹出堆顶已到期的提醒，每次检查的代价为 O(k log n)，k 为到期的提醒数
+            while self.reminders and self.reminders[0][0] <= current_time:
+                fire_at, sequence, task = heapq.heappop(self.reminders)
+                sequences = self._entries.get(task.id)
+                if sequences is None or sequence not in sequences:
+                    continue  # 已被更新或删除的失效元素
+                sequences.discard(sequence)
+                if not sequences:
+                    del self._entries[task.id]
+                if task.state == task_config.STATE_PENDING:
+                    self._fired.add(self._key(task, fire_at))
+                    due.setdefault(task.id, task)
+                    following = self._following_occurrence(task, fire_at, current_time) if task.recurrence else None
+                    if following is not None and following[0] < self._horizon:
+                        self._push(*following)
+        for task in due.values():
+            logger.info("Sending reminder for task %s: %s.", task.id, task.title)
+            for listener in list(self._listeners):
+                try:
+                    listener(task)
+                except Exception:
+                    # 一个回调出错（例如 asyncio 回调所在的事件循环已经关闭）不影响其他回调和提醒线程
+                    logger.exception("Error in reminder listener %r.", listener)
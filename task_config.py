@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from enum import Enum
+import recurrence as recurrence_rules
 
 # Constants for Priority
 PRIORITY_HIGH = "High"
@@ -24,6 +25,12 @@ ALLOWED_PRIORITIES = {PRIORITY_HIGH, PRIORITY_MEDIUM, PRIORITY_LOW}
 ALLOWED_TYPES = {TYPE_WORK, TYPE_STUDY, TYPE_LIFE, TYPE_HEALTH, TYPE_SOCIALIZING, TYPE_ENTERTAINMENT}
 ALLOWED_STATES = {STATE_PENDING, STATE_FINISHED, STATE_OVERDUE}
 
+# 未设置提醒时默认在截止时间前 5 分钟提醒
+DEFAULT_REMINDER_OFFSET = timedelta(minutes=5)
+
+# 分页查询时每页的任务数；定义在这里，界面不必在首次绘制前导入 management（及数据库模块）就能使用
+PAGE_SIZE = 50
+
 # # Enum for Priority
 # class Priority(Enum):
 #     HIGH = "High"
@@ -50,7 +57,12 @@ ALLOWED_STATES = {STATE_PENDING, STATE_FINISHED, STATE_OVERDUE}
 
 # Task 类定义
 class Task:
-    def __init__(self, title, description, deadline, priority, task_type, state=STATE_PENDING, next_time=None, id=None):
+    # 使用 __slots__ 代替实例 __dict__，大量加载任务时显著减少内存占用（名称同样会被改写为 _Task__xxx）
+    __slots__ = ('__id', '__title', '__description', '__deadline', '__priority', '__type', '__state',
+                 '__next_time', '__recurrence', '__recurrence_until', '__reminder_offsets')
+
+    def __init__(self, title, description, deadline, priority, task_type, state=STATE_PENDING, next_time=None, id=None,
+                 recurrence=None, recurrence_until=None, reminder_offsets=None):
         self.__id = id
         self.__title = title
         self.__description = description
@@ -58,10 +70,34 @@ class Task:
         self.__priority = priority
         self.__type = task_type
         self.__state = state
+        self.__reminder_offsets = None
+        if reminder_offsets is not None:
+            self.reminder_offsets = reminder_offsets  # 同时把 next_time 设为第一次提醒的时间
         if next_time:
             self.__next_time = next_time
-        else:
-            self.__next_time = deadline - timedelta(minutes=5)
+        elif reminder_offsets is None:
+            self.__next_time = deadline - DEFAULT_REMINDER_OFFSET
+        # 重复规则（见 recurrence.py），None 表示不重复；recurrence_until 为最后一次发生的日期
+        self.__recurrence = recurrence
+        self.__recurrence_until = recurrence_until
+
+    @classmethod
+    def from_row(cls, row, parse_time=datetime.fromisoformat):
+        """由数据库行 (id, title, description, deadline, priority, type, state, nextTime, recurrence,
+        recurrence_until) 快速构造任务。
+
+        数据库中的值已经在写入时校验过，这里跳过 __init__ 直接赋值。
+        parse_time 用于解析时间列：字符串存储时为 datetime.fromisoformat（比 strptime 快一个数量级），
+        整数时间戳存储时为 datetime.fromtimestamp。
+        """
+        task = cls.__new__(cls)
+        (task.__id, task.__title, task.__description, deadline, task.__priority, task.__type, task.__state,
+         next_time, task.__recurrence, until) = row
+        task.__deadline = parse_time(deadline)
+        task.__next_time = parse_time(next_time) if next_time else task.__deadline - DEFAULT_REMINDER_OFFSET
+        task.__recurrence_until = date.fromisoformat(until) if until else None
+        task.__reminder_offsets = None  # 提醒保存在 reminders 表中，需要时通过 DatabaseManager.reminder_offsets 读取
+        return task
 
     # ID属性仅提供getter，初始化后不能修改
     @property
@@ -100,8 +136,9 @@ class Task:
     @deadline.setter
     def deadline(self, value):
         if isinstance(value, datetime):
+            lead = self.__deadline - self.__next_time  # 保持第一次提醒的提前量不变
             self.__deadline = value
-            self.__next_time = self.__deadline - timedelta(minutes=5)
+            self.__next_time = self.__deadline - lead
         else:
             raise ValueError("Deadline must be a datetime object.")
 
@@ -146,3 +183,43 @@ class Task:
         else:
             raise ValueError("State must be a State enum value.")
 
+    # 重复规则属性
+    @property
+    def recurrence(self):
+        return self.__recurrence
+
+    @recurrence.setter
+    def recurrence(self, value):
+        if value is not None:
+            recurrence_rules.interval(value)  # 规则无效时抛出 ValueError
+        self.__recurrence = value
+
+    @property
+    def recurrence_until(self):
+        return self.__recurrence_until
+
+    @recurrence_until.setter
+    def recurrence_until(self, value):
+        if value is None or isinstance(value, date):
+            self.__recurrence_until = value
+        else:
+            raise ValueError("Recurrence end must be a date object.")
+
+    # 提醒提前量属性：截止时间前多久提醒（timedelta），可以有多个。
+    # None 表示未加载或未修改，保存时保持数据库中原有的提醒不变；空元组表示不提醒
+    @property
+    def reminder_offsets(self):
+        return self.__reminder_offsets
+
+    @reminder_offsets.setter
+    def reminder_offsets(self, value):
+        if value is None:
+            self.__reminder_offsets = None
+            return
+        offsets = tuple(value)
+        if not all(isinstance(offset, timedelta) and offset >= timedelta(0) for offset in offsets):
+            raise ValueError("Reminder offsets must be non-negative timedelta objects.")
+        offsets = tuple(sorted(set(offsets)))
+        self.__reminder_offsets = offsets
+        # next_time 为第一次（提前量最大的）提醒的时间；不提醒时与截止时间相同
+        self.__next_time = self.__deadline - (offsets[-1] if offsets else timedelta(0))
@@ -0,0 +1,260 @@
+"""任务的 CSV / JSONL 流式导入导出，供 cli.py 的 import、export 子命令使用，不依赖 PyQt。
+
+两种格式的字段相同（FIELDS）：时间为 "YYYY-MM-DD HH:MM:SS"，recurrence_until 为 "YYYY-MM-DD"，
+reminders 为截止前多少分钟提醒（CSV 中以分号分隔，JSONL 中为数组；为空表示不提醒，缺少该字段时使用默认提醒）。
+给出 reminders 时 next_time 由最早的提醒决定，next_time 可以省略，给出时必须与之一致。
+id 只用于对照，导入时忽略，任务获得新的 id。
+
+导出通过 DatabaseManager.iter_tasks 按 id 顺序流式读取，导入逐行解析、按块在一个事务中写入，
+内存占用只与块大小有关，与文件行数无关，百万行的文件也可以处理。
+"""
+import csv
+import itertools
+import json
+import logging
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import recurrence
+import task_config
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+
+FIELDS = ("id", "title", "description", "deadline", "priority", "type", "state", "next_time", "recurrence",
+          "recurrence_until", "reminders")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class Progress:
+    """在标准错误输出中报告进度和吞吐量，最多每 interval 秒一行，结束时输出总计"""
+
+    def __init__(self, label: str, stream=None, interval: float = 1.0):
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.count = 0
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def advance(self, count: int = 1):
+        self.count += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self._report(now)
+
+    def finish(self, extra: str = ""):
+        self._report(time.perf_counter(), final=True, extra=extra)
+
+    def _report(self, now, final=False, extra=""):
+        seconds = now - self._start
+        rate = self.count / seconds if seconds > 0 else 0.0
+        prefix = "done: " if final else ""
+        print(f"{prefix}{self.label} {self.count:,} task(s) in {seconds:.1f} s ({rate:,.0f} tasks/s){extra}",
+              file=self.stream, flush=True)
+
+
+def detect_format(path: str, fmt: str = None) -> str:
+    """未指定格式时按扩展名判断，.jsonl / .ndjson 为 JSONL，其余为 CSV"""
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _minutes(offset: timedelta):
+    minutes = offset.total_seconds() / 60
+    return int(minutes) if minutes.is_integer() else minutes
+
+
+def task_to_record(task, offsets) -> dict:
+    """任务转换为导出的记录（JSON 可序列化的值），offsets 为任务的提醒提前量列表"""
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "deadline": task.deadline.strftime(TIME_FORMAT),
+        "priority": task.priority,
+        "type": task.type,
+        "state": task.state,
+        "next_time": task.next_time.strftime(TIME_FORMAT) if task.next_time else None,
+        "recurrence": task.recurrence,
+        "recurrence_until": task.recurrence_until.isoformat() if task.recurrence_until else None,
+        "reminders": [_minutes(offset) for offset in offsets],
+    }
+
+
+def _value(record: dict, key: str):
+    """字段值；缺少、为 null 或为空字符串时返回 None"""
+    value = record.get(key)
+    return None if value is None or value == "" else value
+
+
+def _choice(record: dict, key: str, allowed, default=None):
+    value = _value(record, key)
+    if value is None and default is not None:
+        return default
+    if not isinstance(value, str) or value not in allowed:
+        raise ValueError(f"{key} must be one of {', '.join(sorted(allowed))}, got {value!r}")
+    return value
+
+
+def _time(record: dict, key: str, required: bool = False):
+    value = _value(record, key)
+    if value is None:
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    try:
+        parsed = datetime.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    # 任务时间为本地时间，不接受带时区的值（无法与数据库中的时间比较）
+    if parsed is None or parsed.tzinfo is not None:
+        raise ValueError(f"{key} must be 'YYYY-MM-DD HH:MM:SS', got {value!r}")
+    return parsed
+
+
+def _reminders(record: dict):
+    """提醒提前量：缺少该字段时为 None（使用默认提醒），空值表示不提醒"""
+    if "reminders" not in record or record["reminders"] is None:
+        return None
+    value = record["reminders"]
+    values = value.split(";") if isinstance(value, str) else value
+    try:
+        minutes = [float(item) for item in values if str(item).strip() != ""]
+        offsets = [timedelta(minutes=item) for item in minutes]  # NaN、无穷大等无法转换
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"reminders must be minutes before the deadline, got {value!r}")
+    if any(item < 0 for item in minutes):
+        raise ValueError(f"reminders must not be negative, got {value!r}")
+    return offsets
+
+
+def record_to_task(record: dict):
+    """校验一条导入记录并构造 Task，字段取值不合法时抛出 ValueError"""
+    title = _value(record, "title")
+    if not isinstance(title, str):
+        raise ValueError("title must be a non-empty string")
+    description = _value(record, "description") or ""
+    if not isinstance(description, str):
+        raise ValueError("description must be a string")
+    rule = _value(record, "recurrence")
+    if rule is not None:
+        if not isinstance(rule, str):
+            raise ValueError(f"recurrence must be a string, got {rule!r}")
+        recurrence.interval(rule)  # 规则无效时抛出 ValueError
+    until = _value(record, "recurrence_until")
+    if until is not None:
+        try:
+            if not isinstance(until, str):
+                raise ValueError
+            until = date.fromisoformat(until)
+        except ValueError:
+            raise ValueError(f"recurrence_until must be 'YYYY-MM-DD', got {until!r}")
+    next_time = _time(record, "next_time")
+    offsets = _reminders(record)
+    task = task_config.Task(
+        title=title,
+        description=description,
+        deadline=_time(record, "deadline", required=True),
+        priority=_choice(record, "priority", task_config.ALLOWED_PRIORITIES),
+        task_type=_choice(record, "type", task_config.ALLOWED_TYPES),
+        state=_choice(record, "state", task_config.ALLOWED_STATES, default=task_config.STATE_PENDING),
+        next_time=next_time if offsets is None else None,  # 有提醒时 next_time 为第一次提醒的时间
+        recurrence=rule,
+        recurrence_until=until,
+        reminder_offsets=offsets,
+    )
+    # 时间只精确到秒导出，不到一秒的差异不算冲突
+    if offsets is not None and next_time is not None and abs(task.next_time - next_time) >= timedelta(seconds=1):
+        raise ValueError(f"next_time {next_time:{TIME_FORMAT}} does not match the earliest reminder "
+                         f"({task.next_time:{TIME_FORMAT}})")
+    return task
+
+
+def read_records(stream, fmt: str):
+    """逐行读取导入文件，生成 (行号, 记录)；JSONL 中无法解析的行生成 (行号, ValueError)"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("each line must be a JSON object")
+            continue
+        yield line_number, record
+
+
+def import_tasks(task_manager, stream, fmt: str, chunk_size: int = 10000, strict: bool = False,
+                 progress: Progress = None):
+    """从 stream 导入任务，每 chunk_size 个合法任务在一个事务中写入，返回 (导入数, 跳过数)。
+
+    不合法的行写入日志并跳过；strict=True 时遇到第一个不合法的行即抛出 ValueError，此前已提交的块不会回滚。
+    """
+    rejected = 0
+
+    def tasks():
+        nonlocal rejected
+        for line_number, record in read_records(stream, fmt):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                yield record_to_task(record)
+            except (ValueError, TypeError, OverflowError) as e:  # 后两者为其余未预料到的取值类型和范围
+                if strict:
+                    raise ValueError(f"line {line_number}: {e}") from e
+                rejected += 1
+                logger.warning("Skipping line %d: %s", line_number, e)
+
+    imported = 0
+    rows = tasks()
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        imported += task_manager.add_tasks(chunk)
+        if progress is not None:
+            progress.advance(len(chunk))
+    return imported, rejected
+
+
+def export_tasks(task_manager, stream, fmt: str, criteria=None, batch_size: int = 1000, progress: Progress = None):
+    """按 id 顺序把符合 criteria 的任务流式写入 stream，返回导出的任务数。
+
+    任务由游标（WAL 模式）或键集分页分批读取；每批任务的 id 是一段连续的区间，
+    提醒按 id 区间一次查询，不需要逐个任务查询。
+    """
+    database_manager = task_manager.database_manager
+    tasks = task_manager.iter_tasks(criteria, sort_by="id", batch_size=batch_size)
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+    count = 0
+    while True:
+        batch = list(itertools.islice(tasks, batch_size))
+        if not batch:
+            break
+        offsets = database_manager.reminder_offsets_between(batch[0].id, batch[-1].id)
+        for task in batch:
+            record = task_to_record(task, offsets.get(task.id, []))
+            if fmt == "csv":
+                record["reminders"] = ";".join(str(minutes) for minutes in record["reminders"])
+                writer.writerow(["" if record[field] is None else record[field] for field in FIELDS])
+            else:
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += len(batch)
+        if progress is not None:
+            progress.advance(len(batch))
+    return count
@@ -0,0 +1,71 @@
+import logging
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class _JobSignals(QObject):
+    # 信号在线程池线程中发射，通过队列连接在 GUI 线程中执行回调
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class _Job(QRunnable):
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)  # 由 Python 端的引用管理生命周期
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _JobSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+
+class TaskWorker(QObject):
+    """在后台线程池中执行 TaskManager（或任意）调用，避免 SQLite 查询阻塞 Qt 事件循环。
+
+    结果通过信号回到 GUI 线程，on_result / on_error 回调总是在 GUI 线程中执行，可以直接操作控件。
+    busy_changed 在第一个任务开始和最后一个任务结束时发射，供界面显示加载状态。
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, task_manager=None, pool: QThreadPool = None, parent=None):
+        super().__init__(parent)
+        self.task_manager = task_manager
+        self.pool = pool or QThreadPool.globalInstance()
+        self._jobs = set()  # 保持对执行中任务的引用，防止信号对象在回调前被回收
+
+    @property
+    def busy(self):
+        return bool(self._jobs)
+
+    def submit(self, fn, *args, on_result=None, on_error=None, **kwargs):
+        """在后台执行 fn(*args, **kwargs)。fn 为字符串时视为 task_manager 的方法名。"""
+        if isinstance(fn, str):
+            fn = getattr(self.task_manager, fn)
+        job = _Job(fn, args, kwargs)
+        job.signals.finished.connect(lambda result: self._done(job, on_result, result))
+        job.signals.failed.connect(lambda error: self._done(job, on_error, error))
+        was_busy = self.busy
+        self._jobs.add(job)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        self.pool.start(job)
+        return job
+
+    def _done(self, job, callback, value):
+        self._jobs.discard(job)
+        if not self._jobs:
+            self.busy_changed.emit(False)
+        if callback is not None:
+            callback(value)
+        elif isinstance(value, Exception):
+            logger.error("Background task failed: %s", value, exc_info=value)